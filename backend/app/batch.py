@@ -0,0 +1,120 @@
+import asyncio
+
+from .game_logic import TicTacToeGame
+
+# Hard mode on the classic board is fully deterministic, and so are easy
+# and normal moves with a seed, so identical positions in a batch are only
+# solved once. Unseeded random moves and deadline-bounded searches on larger
+# boards are played per position.
+DETERMINISTIC_DIFFICULTIES = ('hard',)
+SEEDED_DIFFICULTIES = ('easy', 'normal')
+
+
+def position_key(position):
+    # Identical positions share a key; None when the reply may differ
+    if position.difficulty in DETERMINISTIC_DIFFICULTIES and position.board_size == 3 and position.win_length == 3:
+        return (tuple(position.board), position.human_player, position.ai_player)
+    if position.difficulty in SEEDED_DIFFICULTIES and position.seed is not None:
+        return (tuple(position.board), position.human_player, position.ai_player, position.difficulty,
+                position.board_size, position.win_length, position.seed)
+    return None
+
+
+def search_seconds(position, time_limit):
+    # Worst-case time of one position: hard mode on larger boards searches
+    # until its deadline, everything else takes microseconds
+    if position.difficulty == 'hard' and (position.board_size, position.win_length) != (3, 3):
+        return time_limit or 0.0
+    return 0.0
+
+
+def play_position(position, time_limit=None):
+    # Returns a plain dict: move (None when the position was already over),
+    # winner and game_active after the move
+    game = TicTacToeGame(
+        board=list(position.board),
+        human_player=position.human_player,
+        ai_player=position.ai_player,
+        current_player=position.ai_player,
+        difficulty=position.difficulty,
+        game_active=True,
+        winner=None,
+        board_size=position.board_size,
+        win_length=position.win_length,
+        time_limit=time_limit,
+        seed=position.seed
+    )
+    for player in (game.human_player, game.ai_player):
+        if game.check_win(player):
+            return {"move": None, "winner": player, "game_active": False}
+    if game.is_board_full():
+        return {"move": None, "winner": "tie", "game_active": False}
+
+    move = game.get_ai_move()
+    game.make_move(move, game.ai_player)
+    if game.check_win_at(move, game.ai_player):
+        return {"move": move, "winner": game.ai_player, "game_active": False}
+    if game.is_board_full():
+        return {"move": move, "winner": "tie", "game_active": False}
+    return {"move": move, "winner": None, "game_active": True}
+
+
+def play_positions(positions, time_limit=None):
+    # Runs in an engine pool worker; the positions are already deduplicated
+    return [play_position(position, time_limit) for position in positions]
+
+
+class BatchSolver:
+    # Plays the AI's reply for many positions. Positions only need board,
+    # human_player, ai_player, difficulty, board_size, win_length and seed
+    # attributes.
+
+    def __init__(self, time_limit=None):
+        self.time_limit = time_limit
+        self.solved = 0
+        self.duplicates = 0
+
+    async def stream(self, positions, run, chunk_size, chunk_seconds, window=1):
+        # Yields the results chunk by chunk, in request order. Duplicates are
+        # found here, across the whole batch; each chunk's new positions are
+        # played by run(play_positions, positions, time_limit), an engine
+        # pool's, with up to window chunks in flight. A chunk holds at most
+        # chunk_size positions and chunk_seconds of worst-case search time.
+        first = {}
+        chunks = []
+        chunk, cost = [], 0.0
+        for index, position in enumerate(positions):
+            key = position_key(position)
+            source = first.setdefault(key, index) if key is not None else index
+            seconds = search_seconds(position, self.time_limit) if source == index else 0.0
+            if chunk and (len(chunk) == chunk_size or cost + seconds > chunk_seconds):
+                chunks.append(chunk)
+                chunk, cost = [], 0.0
+            chunk.append((index, source))
+            cost += seconds
+        if chunk:
+            chunks.append(chunk)
+
+        def submit(chunk):
+            new = [positions[index] for index, source in chunk if source == index]
+            return asyncio.ensure_future(run(play_positions, new, self.time_limit))
+
+        results = {}
+        pending = [submit(chunk) for chunk in chunks[:window]]
+        try:
+            for number, chunk in enumerate(chunks):
+                played = iter(await pending.pop(0))
+                if number + window < len(chunks):
+                    pending.append(submit(chunks[number + window]))
+                # A duplicate's first occurrence is in this chunk or an
+                # earlier one, so its result is known by now
+                for index, source in chunk:
+                    if source == index:
+                        results[index] = next(played)
+                        self.solved += 1
+                    else:
+                        self.duplicates += 1
+                yield [results[source] for _, source in chunk]
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,172 @@
+from functools import cache
+
+# Compact board representation: one integer per player, bit i set when that
+# player holds cell i. The API and database keep using the list[str] format;
+# encode/decode convert at the boundary. The module-level tables below cover
+# the classic 3x3 board; Geometry handles any N x N board with K in a row.
+
+WINNING_COMBINATIONS = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # columns
+    (0, 4, 8), (2, 4, 6)  # diagonals
+)
+
+WIN_MASKS = tuple((1 << a) | (1 << b) | (1 << c) for a, b, c in WINNING_COMBINATIONS)
+FULL_MASK = 0x1FF
+
+
+def _has_line(bits):
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+# Every 9-bit value is precomputed, so win detection and move generation are
+# a single tuple index during search.
+WINNING = tuple(_has_line(bits) for bits in range(FULL_MASK + 1))
+LEGAL_MOVES = tuple(
+    tuple(i for i in range(9) if not occupied >> i & 1)
+    for occupied in range(FULL_MASK + 1)
+)
+
+
+def _completing_cells(bits, masks):
+    # Cells that would complete a line: lines missing exactly one cell
+    cells = 0
+    for mask in masks:
+        missing = mask & ~bits
+        if missing and not missing & (missing - 1):
+            cells |= missing
+    return cells
+
+
+# Threat table: THREATS[bits] & free is the set of winning moves for a
+# player holding bits, with no board copies or per-move win checks.
+THREATS = tuple(_completing_cells(bits, WIN_MASKS) for bits in range(FULL_MASK + 1))
+
+
+def encode(board, player):
+    bits = 0
+    for i, cell in enumerate(board):
+        if cell == player:
+            bits |= 1 << i
+    return bits
+
+
+def decode(x_bits, o_bits, x='X', o='O', cells=9):
+    board = [''] * cells
+    for i in range(cells):
+        if x_bits >> i & 1:
+            board[i] = x
+        elif o_bits >> i & 1:
+            board[i] = o
+    return board
+
+
+def is_win(bits):
+    return WINNING[bits]
+
+
+def is_full(occupied):
+    return occupied == FULL_MASK
+
+
+def legal_moves(occupied):
+    return LEGAL_MOVES[occupied]
+
+
+def lowest_cell(bits):
+    return (bits & -bits).bit_length() - 1
+
+
+def cells_of(bits):
+    # Set bits as a list of cells, lowest first
+    cells = []
+    while bits:
+        low = bits & -bits
+        cells.append(low.bit_length() - 1)
+        bits ^= low
+    return cells
+
+
+class Geometry:
+    # Line masks for an N x N board where K in a row wins. Instances are
+    # shared through get_geometry, so the masks are built once per size.
+
+    def __init__(self, size, win_length):
+        self.size = size
+        self.win_length = win_length
+        self.cells = size * size
+        self.full_mask = (1 << self.cells) - 1
+
+        masks = []
+        for row in range(size):
+            for col in range(size):
+                for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row = row + d_row * (win_length - 1)
+                    end_col = col + d_col * (win_length - 1)
+                    if end_row >= size or not 0 <= end_col < size:
+                        continue
+                    mask = 0
+                    for step in range(win_length):
+                        mask |= 1 << ((row + d_row * step) * size + col + d_col * step)
+                    masks.append(mask)
+        self.win_masks = tuple(masks)
+        # Lines through each cell: after a move only these can have changed
+        self.masks_through = tuple(
+            tuple(mask for mask in masks if mask >> cell & 1)
+            for cell in range(self.cells)
+        )
+
+        last = size - 1
+        self.corners = (0, last, last * size, self.cells - 1)
+        self.edges = tuple(
+            cell for cell in range(self.cells)
+            if cell not in self.corners and (cell // size in (0, last) or cell % size in (0, last))
+        )
+        self.corner_mask = sum(1 << cell for cell in self.corners)
+        self.edge_mask = sum(1 << cell for cell in self.edges)
+        middle = (size - 1) / 2
+        self.center_order = tuple(sorted(
+            range(self.cells),
+            key=lambda cell: (abs(cell // size - middle) + abs(cell % size - middle), cell)
+        ))
+        # Cells within two steps of each cell, used to keep the search near
+        # the stones on large boards
+        self.neighbourhood = tuple(
+            sum(
+                1 << (r * size + c)
+                for r in range(max(0, cell // size - 2), min(size, cell // size + 3))
+                for c in range(max(0, cell % size - 2), min(size, cell % size + 3))
+            )
+            for cell in range(self.cells)
+        )
+
+    def has_win(self, bits):
+        for mask in self.win_masks:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def wins_at(self, bits, cell):
+        # Incremental check: only the lines through the last move are scanned
+        for mask in self.masks_through[cell]:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def threats(self, bits):
+        # Cells that would complete a line for a player holding bits; the
+        # classic board reads them from THREATS
+        if self.cells == 9 and self.win_length == 3:
+            return THREATS[bits]
+        return _completing_cells(bits, self.win_masks)
+
+    def legal_moves(self, occupied):
+        return cells_of(~occupied & self.full_mask)
+
+
+@cache
+def get_geometry(size, win_length):
+    return Geometry(size, win_length)
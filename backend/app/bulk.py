@@ -0,0 +1,109 @@
+# Bulk export and import of games with Postgres COPY:
+#
+#     python -m app.bulk export --status finished --format csv --output games.csv
+#     python -m app.bulk import games.ndjson --batch-size 10000
+#
+# Both stream, so memory use does not grow with the number of rows, and
+# report throughput in rows/sec on stderr.
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from contextlib import nullcontext
+
+from .database import (
+    EXPORT_SOURCES,
+    _board_from_text,
+    close_pool,
+    export_games,
+    import_games,
+)
+
+GAME_DEFAULTS = {"board_size": 3, "win_length": 3, "winner": None, "score_x": 0, "score_o": 0, "seed": None}
+INTEGER_COLUMNS = ("board_size", "win_length", "score_x", "score_o", "seed")
+
+
+def _game_record(data):
+    game = {**GAME_DEFAULTS, **data}
+    # CSV exports carry the board as stored: one character per cell
+    if isinstance(game["board"], str):
+        game["board"] = _board_from_text(game["board"])
+    return game
+
+
+def read_ndjson(lines):
+    for line in lines:
+        if line.strip():
+            yield _game_record(json.loads(line))
+
+
+def read_csv(lines):
+    for row in csv.DictReader(lines):
+        row["seed"] = row.get("seed") or None
+        for column in INTEGER_COLUMNS:
+            if row.get(column):
+                row[column] = int(row[column])
+        row["game_active"] = row["game_active"].lower() in ("t", "true", "1")
+        row["winner"] = row.get("winner") or None
+        yield _game_record(row)
+
+
+def _report(action, rows, elapsed):
+    print(f"{action} {rows} rows in {elapsed:.1f} s: {rows / elapsed if elapsed else 0:.0f} rows/s", file=sys.stderr)
+
+
+async def export_command(args, output):
+    rows = 0
+    start = time.perf_counter()
+    try:
+        async for chunk in export_games(args.format, args.status):
+            output.write(chunk)
+            rows += chunk.count(b"\n")
+    finally:
+        await close_pool()
+    if args.format == "csv" and rows:
+        # The header line is not a game
+        rows -= 1
+    _report("exported", rows, time.perf_counter() - start)
+
+
+async def import_command(args, lines):
+    fmt = args.format or ("csv" if args.file.endswith(".csv") else "ndjson")
+    start = time.perf_counter()
+    try:
+        games = read_csv(lines) if fmt == "csv" else read_ndjson(lines)
+        rows = await import_games(games, args.batch_size)
+    finally:
+        await close_pool()
+    _report("imported", rows, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.bulk")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write games to a file or stdout")
+    export.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    export.add_argument("--status", choices=tuple(EXPORT_SOURCES), default="finished")
+    export.add_argument("--output", help="file to write; stdout when left out")
+
+    load = commands.add_parser("import", help="insert games from an NDJSON or CSV file")
+    load.add_argument("file")
+    load.add_argument("--format", choices=("ndjson", "csv"), help="defaults to the file extension")
+    load.add_argument("--batch-size", type=int, default=10000, help="rows per COPY")
+
+    args = parser.parse_args(argv)
+    # Files are opened here, outside the event loop
+    if args.command == "export":
+        with open(args.output, "wb") if args.output else nullcontext(sys.stdout.buffer) as output:
+            asyncio.run(export_command(args, output))
+    else:
+        with open(args.file, newline="") as lines:
+            asyncio.run(import_command(args, lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,349 @@
+import asyncio
 import os
-import psycopg2
-from psycopg2 import Error as PgError
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import asyncpg
 from fastapi import HTTPException
 
+from .metrics import (
+    DB_POOL_CONNECTIONS,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAIT_SECONDS,
+    DB_STAGE_SECONDS,
+)
+from .migrations import MIGRATIONS
+
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_USER = os.getenv("DB_USER", "user")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 DB_NAME = os.getenv("DB_NAME", "database")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Seconds to wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+# Idle connections are closed after this many seconds; asyncpg also resets
+# connections on release and replaces broken ones
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
+GAME_COLUMNS = (
+    "board", "board_size", "win_length", "human_player", "ai_player", "current_player",
+    "difficulty", "game_active", "winner", "score_x", "score_o", "seed"
+)
+# Read back with every game; version is bumped by each write
+ROW_COLUMNS = ("id", "version", *GAME_COLUMNS)
+# Boards are stored one character per cell with this for empty cells
+EMPTY_CELL = "."
+# pg_advisory_lock key held while migrations run
+MIGRATION_LOCK_ID = 7_150_001
+
+_pool = None
+_pool_loop = None
+
+async def init_pool():
+    global _pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    # A pool belongs to the event loop that created it (tests run one loop
+    # per test), so a pool left over from another loop is replaced
+    if _pool is None or _pool_loop is not loop:
+        _pool = await asyncpg.create_pool(
             host=DB_HOST,
             port=DB_PORT,
             user=DB_USER,
             password=DB_PASSWORD,
-            dbname=DB_NAME
+            database=DB_NAME,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            max_inactive_connection_lifetime=DB_POOL_MAX_IDLE
         )
-        return conn
-    except PgError as e:
+        _pool_loop = loop
+        pool = _pool
+        DB_POOL_CONNECTIONS.labels("idle").set_function(pool.get_idle_size)
+        DB_POOL_CONNECTIONS.labels("in_use").set_function(lambda: pool.get_size() - pool.get_idle_size())
+    return _pool
+
+async def close_pool():
+    global _pool, _pool_loop
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        _pool_loop = None
+
+@contextmanager
+def _timed(operation, stage):
+    start = time.perf_counter()
+    yield
+    DB_STAGE_SECONDS.labels(operation, stage).observe(time.perf_counter() - start)
+
+@asynccontextmanager
+async def get_db_connection(operation="other"):
+    # Borrows a connection from the pool for the duration of the block
+    start = time.perf_counter()
+    try:
+        pool = await init_pool()
+        conn = await pool.acquire(timeout=DB_POOL_TIMEOUT)
+    except TimeoutError:
+        DB_POOL_TIMEOUTS.inc()
+        raise HTTPException(status_code=503, detail="Database busy: no free connection")
+    except (asyncpg.PostgresError, OSError) as e:
         raise HTTPException(status_code=500, detail=f"Database connection error: {e}")
+    waited = time.perf_counter() - start
+    DB_POOL_WAIT_SECONDS.observe(waited)
+    DB_STAGE_SECONDS.labels(operation, "acquire").observe(waited)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+@asynccontextmanager
+async def transaction(operation="other"):
+    async with get_db_connection(operation) as conn:
+        tr = conn.transaction()
+        await tr.start()
+        try:
+            yield conn
+        except BaseException:
+            await tr.rollback()
+            raise
+        with _timed(operation, "commit"):
+            await tr.commit()
+
+def _board_to_text(board):
+    return "".join(cell or EMPTY_CELL for cell in board)
+
+def _board_from_text(text):
+    return ["" if cell == EMPTY_CELL else cell for cell in text]
+
+def _game_values(game):
+    return [_board_to_text(game["board"]) if column == "board" else game[column] for column in GAME_COLUMNS]
+
+def _game_from_row(row):
+    game = dict(row)
+    game["board"] = _board_from_text(game["board"])
+    return game
+
+async def insert_game(game):
+    placeholders = ", ".join(f"${i}" for i in range(1, len(GAME_COLUMNS) + 1))
+    with _timed("insert_game", "encode"):
+        values = _game_values(game)
+    async with get_db_connection("insert_game") as conn:
+        with _timed("insert_game", "execute"):
+            return await conn.fetchval(
+                f"INSERT INTO games ({', '.join(GAME_COLUMNS)}) VALUES ({placeholders}) RETURNING id",
+                *values
+            )
+
+async def _fetch_from(table, operation, game_id):
+    async with get_db_connection(operation) as conn:
+        with _timed(operation, "execute"):
+            row = await conn.fetchrow(f"SELECT {', '.join(ROW_COLUMNS)} FROM {table} WHERE id = $1", game_id)
+    if not row:
+        return None
+    with _timed(operation, "decode"):
+        return _game_from_row(row)
+
+async def fetch_game(game_id):
+    # Games that can still be written; archived ones are only found by
+    # fetch_archived_game
+    return await _fetch_from("games", "fetch_game", game_id)
 
-def create_table():
-    conn = None
+async def fetch_archived_game(game_id):
+    return await _fetch_from("games_archive", "fetch_archived_game", game_id)
+
+# Columns a turn can change, with their types; the rest are fixed when a
+# game is created
+TURN_COLUMNS = ("board", "current_player", "game_active", "winner", "score_x", "score_o")
+TURN_TYPES = ("text", "text", "boolean", "text", "integer", "integer")
+
+def _turn_values(game):
+    return [_board_to_text(game["board"]) if column == "board" else game[column] for column in TURN_COLUMNS]
+
+async def write_turn(conn, game_id, game, base_version):
+    # Writes the columns a move changes, and game's version, if the row is
+    # still at base_version. Returns False when another write came first.
+    assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate((*TURN_COLUMNS, "version"), start=1))
+    id_index = len(TURN_COLUMNS) + 2
+    with _timed("write_turn", "encode"):
+        values = [*_turn_values(game), game["version"]]
+    with _timed("write_turn", "execute"):
+        result = await conn.execute(
+            f"UPDATE games SET {assignments}, updated_at = now() WHERE id = ${id_index} AND version = ${id_index + 1}",
+            *values, game_id, base_version
+        )
+    return int(result.split()[-1]) == 1
+
+def _save_query():
+    # One UPDATE for a whole batch, from one array per column; a row is only
+    # written while it is still at the version the new state was based on
+    columns = ("id", "base_version", "version", *TURN_COLUMNS)
+    types = ("integer", "integer", "integer", *TURN_TYPES)
+    arrays = ", ".join(f"${i}::{type_}[]" for i, type_ in enumerate(types, start=1))
+    assignments = ", ".join(f"{column} = u.{column}" for column in (*TURN_COLUMNS, "version"))
+    return f"""
+        UPDATE games AS g SET {assignments}, updated_at = now()
+        FROM unnest({arrays}) AS u({', '.join(columns)})
+        WHERE g.id = u.id AND g.version = u.base_version
+        RETURNING g.id
+    """
+
+async def write_moves(conn, moves):
+    # Appends (game_id, ply, cell, player) rows to the move log. Moves that
+    # are already logged are skipped, so a retried flush is harmless.
+    with _timed("write_moves", "execute"):
+        await conn.executemany(
+            "INSERT INTO moves (game_id, ply, cell, player) VALUES ($1, $2, $3, $4) ON CONFLICT DO NOTHING",
+            moves
+        )
+
+async def fetch_moves(game_id):
+    async with get_db_connection("fetch_moves") as conn:
+        with _timed("fetch_moves", "execute"):
+            rows = await conn.fetch("SELECT ply, cell, player FROM moves WHERE game_id = $1 ORDER BY ply", game_id)
+    return [dict(row) for row in rows]
+
+async def save_games(games, moves=()):
+    # Writes many (game_id, game, base_version) games, and the (game_id,
+    # ply, cell, player) moves that led to them, in one transaction. A game
+    # whose row has moved on from base_version was written by another
+    # process since; it is skipped with its moves. Returns the skipped ids.
+    with _timed("save_games", "encode"):
+        rows = [(game_id, base_version, game["version"], *_turn_values(game)) for game_id, game, base_version in games]
+        arrays = [list(column) for column in zip(*rows)]
+    async with transaction("save_games") as conn:
+        with _timed("save_games", "execute"):
+            written = {row["id"] for row in await conn.fetch(_save_query(), *arrays)}
+        await write_moves(conn, [move for move in moves if move[0] in written])
+    return [game_id for game_id, _, _ in games if game_id not in written]
+
+async def archive_finished_games(older_than, limit):
+    # Moves up to limit games that finished more than older_than seconds ago
+    # into games_archive, keeping the games table to the working set. Returns
+    # the number of games moved.
+    columns = ", ".join((*ROW_COLUMNS, "updated_at"))
+    async with transaction("archive_games") as conn:
+        with _timed("archive_games", "execute"):
+            result = await conn.execute(f"""
+                WITH moved AS (
+                    DELETE FROM games WHERE id IN (
+                        SELECT id FROM games
+                        WHERE NOT game_active AND updated_at < now() - make_interval(secs => $1)
+                        LIMIT $2
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {columns}
+                )
+                INSERT INTO games_archive ({columns}) SELECT {columns} FROM moved
+            """, older_than, limit)
+    return int(result.split()[-1])
+
+async def fetch_stats():
+    # Finished-game counts by difficulty, board, symbols and outcome (human,
+    # ai or tie), from the trigger-maintained game_stats table
+    async with get_db_connection("fetch_stats") as conn:
+        with _timed("fetch_stats", "execute"):
+            rows = await conn.fetch(
+                "SELECT difficulty, board_size, win_length, human_player, ai_player, outcome, games FROM game_stats"
+            )
+    return [dict(row) for row in rows]
+
+# Which games an export includes; finished games may be in the archive
+EXPORT_SOURCES = {
+    "active": (("games", "game_active"),),
+    "finished": (("games", "NOT game_active"), ("games_archive", "TRUE")),
+    "all": (("games", "TRUE"), ("games_archive", "TRUE")),
+}
+EXPORT_COLUMNS = ("id", *GAME_COLUMNS, "updated_at")
+
+def _export_query(fmt, status):
+    source = " UNION ALL ".join(
+        f"SELECT {', '.join(EXPORT_COLUMNS)} FROM {table} WHERE {condition}"
+        for table, condition in EXPORT_SOURCES[status]
+    )
+    if fmt == "csv":
+        return f"SELECT * FROM ({source}) g ORDER BY id", {"format": "csv", "header": True}
+    # One JSON object per line with the board as a list, as the API returns
+    # it. CSV with quote and delimiter characters that never occur in JSON
+    # makes COPY write the JSON unescaped.
+    columns = ", ".join(
+        f"array_replace(string_to_array(board, NULL), '{EMPTY_CELL}', '') AS board" if column == "board" else column
+        for column in EXPORT_COLUMNS
+    )
+    query = f"SELECT row_to_json(g) FROM (SELECT {columns} FROM ({source}) s ORDER BY id) g"
+    return query, {"format": "csv", "quote": "\x01", "delimiter": "\x02"}
+
+async def export_games(fmt="ndjson", status="finished", buffer_chunks=64):
+    # Streams games out with COPY as bytes chunks of NDJSON or CSV. At most
+    # buffer_chunks chunks are held in memory; COPY waits while the consumer
+    # catches up.
+    query, options = _export_query(fmt, status)
+    chunks = asyncio.Queue(maxsize=buffer_chunks)
+    failure = []
+
+    async def copy():
+        try:
+            async with get_db_connection("export_games") as conn:
+                await conn.copy_from_query(query, output=chunks.put, **options)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            failure.append(e)
+        await chunks.put(None)
+
+    task = asyncio.create_task(copy())
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS games (
-                id SERIAL PRIMARY KEY,
-                board JSONB NOT NULL,
-                human_player VARCHAR(1) NOT NULL,
-                ai_player VARCHAR(1) NOT NULL,
-                current_player VARCHAR(1) NOT NULL,
-                difficulty VARCHAR(10) NOT NULL,
-                game_active BOOLEAN NOT NULL,
-                winner VARCHAR(1),
-                score_x INTEGER DEFAULT 0,
-                score_o INTEGER DEFAULT 0
-            );
-        """)
-        conn.commit()
-    except PgError as e:
-        print(f"Error creating table: {e}")
-        # In a real application, you might want to log this error more robustly
+        while (chunk := await chunks.get()) is not None:
+            yield chunk
+        if failure:
+            raise failure[0]
     finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+        task.cancel()
+
+async def import_games(games, batch_size=10000):
+    # Inserts games (an iterable of dicts with GAME_COLUMNS keys) with one
+    # COPY per batch; ids are assigned by the database. Returns the number of
+    # rows written.
+    count = 0
+    async with get_db_connection("import_games") as conn:
+        batch = []
+        for game in games:
+            batch.append(_game_values(game))
+            if len(batch) == batch_size:
+                await conn.copy_records_to_table("games", records=batch, columns=GAME_COLUMNS)
+                count += len(batch)
+                batch = []
+        if batch:
+            await conn.copy_records_to_table("games", records=batch, columns=GAME_COLUMNS)
+            count += len(batch)
+    return count
+
+async def migrate():
+    # Applies the migrations not yet recorded in schema_migrations. Every
+    # worker runs this on startup; the advisory lock lets one apply them
+    # while the others wait and then find nothing left to do.
+    async with get_db_connection("migrate") as conn:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        try:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+            applied = {row["version"] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+            for version, name, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                async with conn.transaction():
+                    for statement in statements:
+                        await conn.execute(statement)
+                    await conn.execute("INSERT INTO schema_migrations (version, name) VALUES ($1, $2)", version, name)
+                print(f"Applied migration {version}: {name}")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+
+async def ping_database():
+    # Round trip for readiness checks
+    async with get_db_connection("ping") as conn:
+        await conn.fetchval("SELECT 1")
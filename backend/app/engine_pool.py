@@ -0,0 +1,149 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from .metrics import (
+    ENGINE_POOL_FALLBACKS,
+    ENGINE_POOL_QUEUE_DEPTH,
+    ENGINE_POOL_RESTARTS,
+    ENGINE_POOL_TASK_SECONDS,
+    ENGINE_POOL_TIMEOUTS,
+)
+from .profiling import profiling_request
+from .solver import get_solved_table
+
+# Worker processes for AI searches; 0 runs every search in-process
+ENGINE_POOL_WORKERS = int(os.getenv("ENGINE_POOL_WORKERS", "2"))
+# Searches allowed to wait for a worker before new ones run in-process
+ENGINE_POOL_MAX_PENDING = int(os.getenv("ENGINE_POOL_MAX_PENDING", str(ENGINE_POOL_WORKERS * 4)))
+# Seconds a request waits for its search before giving up
+ENGINE_TASK_TIMEOUT = float(os.getenv("ENGINE_TASK_TIMEOUT", "2"))
+
+def _init_worker(started=None):
+    # Every worker builds its own copy of the solved table once, then
+    # reports that it is ready
+    get_solved_table()
+    if started is not None:
+        started.put(os.getpid())
+
+def _noop():
+    return None
+
+class EnginePool:
+    # Runs CPU-bound AI searches in worker processes so a long search does
+    # not hold the web worker's GIL. Requests await the result. When every
+    # worker is busy and max_pending searches are already queued, or the
+    # pool is not running, the search runs in the threadpool instead. A
+    # worker that dies breaks the whole executor; it is then replaced and
+    # the searches it failed are run again in the threadpool.
+
+    def __init__(self, workers=ENGINE_POOL_WORKERS, max_pending=ENGINE_POOL_MAX_PENDING, timeout=ENGINE_TASK_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._started = None
+        # The executor a dead worker broke; stale once it has been replaced
+        self._broken_executor = None
+        ENGINE_POOL_QUEUE_DEPTH.set_function(lambda: self.pending)
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            # spawn rather than fork: the parent runs an event loop and threads
+            context = multiprocessing.get_context("spawn")
+            self._started = context.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._started,)
+            )
+
+    async def warm(self, timeout=60):
+        # Starts every worker now rather than on the first searches, which
+        # would otherwise wait for the process to start, import the app and
+        # build its tables. Workers are started on demand, one per task
+        # submitted while none is idle. Returns the number of workers ready.
+        if self._executor is None:
+            return 0
+        for _ in range(self.workers):
+            self._executor.submit(_noop)
+        deadline = time.monotonic() + timeout
+        ready = 0
+        while ready < self.workers:
+            try:
+                await run_in_threadpool(self._started.get, True, max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            ready += 1
+        return ready
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._started = None
+
+    async def run(self, fn, *args):
+        # fn and args must be picklable: a module-level function and plain
+        # data or pydantic models
+        if profiling_request.get():
+            # Inline, so the request's profile includes the search
+            return fn(*args)
+        if self._executor is None or self.pending >= self.max_pending:
+            ENGINE_POOL_FALLBACKS.inc()
+            return await run_in_threadpool(fn, *args)
+
+        executor = self._executor
+        start = time.perf_counter()
+        try:
+            task = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._broken_executor = executor
+            self.restart_if_broken()
+            ENGINE_POOL_FALLBACKS.inc()
+            return await run_in_threadpool(fn, *args)
+        # Counted until a worker is done with it: a task given up on below
+        # keeps its worker busy, and later tasks queue behind it
+        with self._lock:
+            self.pending += 1
+        task.add_done_callback(lambda task: self._task_done(executor, task))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(task), self.timeout)
+        except TimeoutError:
+            ENGINE_POOL_TIMEOUTS.inc()
+            raise HTTPException(status_code=504, detail="AI move timed out")
+        except BrokenProcessPool:
+            self.restart_if_broken()
+            ENGINE_POOL_FALLBACKS.inc()
+            return await run_in_threadpool(fn, *args)
+        finally:
+            ENGINE_POOL_TASK_SECONDS.observe(time.perf_counter() - start)
+
+    def restart_if_broken(self):
+        # Replaces an executor a dead worker broke, whose every later submit
+        # would fail; returns True when it did. The new workers start on
+        # demand.
+        if self._executor is None or self._broken_executor is not self._executor:
+            return False
+        self.stop()
+        self.start()
+        ENGINE_POOL_RESTARTS.inc()
+        return True
+
+    def _task_done(self, executor, task):
+        # Called from the executor's management thread
+        with self._lock:
+            self.pending -= 1
+        if not task.cancelled() and isinstance(task.exception(), BrokenProcessPool):
+            self._broken_executor = executor
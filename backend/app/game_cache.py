@@ -0,0 +1,181 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from .metrics import (
+    GAME_CACHE_CONFLICTS,
+    GAME_CACHE_DIRTY,
+    GAME_CACHE_FLUSHED_ROWS,
+    GAME_CACHE_REQUESTS,
+)
+
+GAME_CACHE_SIZE = int(os.getenv("GAME_CACHE_SIZE", "10000"))
+# Seconds an entry may be served without being read again from the database
+GAME_CACHE_TTL = float(os.getenv("GAME_CACHE_TTL", "300"))
+# Seconds between write-behind flushes; this is also the most game state
+# that can be lost if the process dies without a clean shutdown
+GAME_CACHE_FLUSH_INTERVAL = float(os.getenv("GAME_CACHE_FLUSH_INTERVAL", "1"))
+GAME_CACHE_FLUSH_BATCH_SIZE = int(os.getenv("GAME_CACHE_FLUSH_BATCH_SIZE", "500"))
+
+class GameCache:
+    # Bounded LRU/TTL cache of game state keyed by id, in front of the games
+    # table. Reads are served from memory; writes are coalesced per game and
+    # flushed in batches by a background task, immediately when a game
+    # finishes, and on shutdown.
+    #
+    # The cache is per process. Every game carries the version of its row,
+    # and a flush only writes rows still at the version its state was based
+    # on: state written from a stale copy, because another worker wrote the
+    # game since, is dropped rather than overwriting the newer row. A game
+    # should still be served by one worker, for its reads to be current.
+
+    def __init__(self, writer, max_size=GAME_CACHE_SIZE, ttl=GAME_CACHE_TTL,
+                 flush_interval=GAME_CACHE_FLUSH_INTERVAL, flush_batch_size=GAME_CACHE_FLUSH_BATCH_SIZE):
+        # writer is an async callable taking a list of (game_id, game,
+        # base_version) games and the (game_id, ply, cell, player) moves that
+        # led to them; it writes them in one transaction, skipping games whose
+        # row is no longer at base_version, and returns the skipped ids
+        self.writer = writer
+        self.max_size = max_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self._entries = OrderedDict()  # game_id -> (game, expires_at)
+        self._dirty = {}  # game_id -> (latest unflushed game, version of the row it replaces)
+        self._moves = {}  # game_id -> unflushed moves, oldest first
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        GAME_CACHE_DIRTY.set_function(lambda: len(self._dirty))
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, game_id):
+        dirty = self._dirty.get(game_id)
+        if dirty is not None:
+            # Pending writes are always served, even after LRU eviction
+            self._store(game_id, dirty[0])
+            return self._hit(dirty[0])
+
+        entry = self._entries.get(game_id)
+        if entry is not None:
+            game, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(game_id)
+                return self._hit(game)
+            del self._entries[game_id]
+
+        GAME_CACHE_REQUESTS.labels("miss").inc()
+        return None
+
+    def _hit(self, game):
+        GAME_CACHE_REQUESTS.labels("hit").inc()
+        return game
+
+    def put(self, game_id, game):
+        # Caches state that is already in the database. A pending write based
+        # on this version or a later one is newer and is kept; one based on
+        # an older version would be refused by the flush, so it is dropped.
+        dirty = self._dirty.get(game_id)
+        if dirty is not None:
+            if dirty[1] >= game["version"]:
+                return
+            self._drop(game_id)
+        if self.enabled:
+            self._store(game_id, game)
+
+    def write(self, game_id, game, moves=()):
+        # Caches state that still has to reach the database, along with the
+        # (ply, cell, player) moves that led to it. game["version"] is one
+        # more than the version of the state it was played from.
+        if moves:
+            self._moves.setdefault(game_id, []).extend((game_id, *move) for move in moves)
+        dirty = self._dirty.get(game_id)
+        # Coalesced writes replace the row the first one was based on
+        self._dirty[game_id] = (game, dirty[1] if dirty is not None else game["version"] - 1)
+        if self.enabled:
+            self._store(game_id, game)
+
+    def _store(self, game_id, game):
+        self._entries[game_id] = (game, time.monotonic() + self.ttl)
+        self._entries.move_to_end(game_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _drop(self, game_id):
+        self._entries.pop(game_id, None)
+        self._dirty.pop(game_id, None)
+        self._moves.pop(game_id, None)
+
+    async def flush(self):
+        # Returns the ids of games whose writes were refused
+        conflicts = []
+        async with self._flush_lock:
+            while self._dirty:
+                batch = list(self._dirty.items())[:self.flush_batch_size]
+                for game_id, _ in batch:
+                    del self._dirty[game_id]
+                conflicts.extend(await self._write(batch))
+        return conflicts
+
+    async def flush_game(self, game_id):
+        # Writes one game's pending state, after waiting out any flush already
+        # in progress, so nothing older can land on the row afterwards.
+        # Returns False when the write was refused.
+        async with self._flush_lock:
+            dirty = self._dirty.pop(game_id, None)
+            if dirty is None:
+                return True
+            return not await self._write([(game_id, dirty)])
+
+    async def _write(self, batch):
+        moves = []
+        for game_id, _ in batch:
+            moves.extend(self._moves.pop(game_id, ()))
+        try:
+            conflicts = await self.writer([(game_id, game, base) for game_id, (game, base) in batch], moves)
+        except Exception:
+            # Put the batch back unless a newer write replaced it; its moves
+            # go back in front of any logged since
+            for game_id, dirty in batch:
+                if game_id in self._dirty:
+                    self._dirty[game_id] = (self._dirty[game_id][0], dirty[1])
+                else:
+                    self._dirty[game_id] = dirty
+            for move in reversed(moves):
+                self._moves.setdefault(move[0], []).insert(0, move)
+            raise
+        for game_id in conflicts:
+            # The row is newer than this copy, and so is anything played from
+            # it since; the next read loads the row
+            print(f"Dropped write to game {game_id}: it was changed by another process")
+            self._drop(game_id)
+        GAME_CACHE_FLUSHED_ROWS.inc(len(batch) - len(conflicts))
+        GAME_CACHE_CONFLICTS.inc(len(conflicts))
+        return conflicts
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing game cache: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        # Everything acknowledged before shutdown reaches the database, unless
+        # another process wrote the game since
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
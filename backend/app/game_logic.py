@@ -1,7 +1,63 @@
 import random
+import time
+
+from .bitboard import cells_of, encode, get_geometry, is_win, lowest_cell
+from .search import AlphaBetaSearch, HeuristicSearch, SearchResult
+from .solver import lookup_best_move
+
+DIFFICULTIES = ('easy', 'normal', 'hard')
+
+# Shared so transposition-table entries carry over between requests
+_search_table = {}
+
+
+MASK64 = (1 << 64) - 1
+
+
+class MoveRandom:
+    # SplitMix64 generator with the random()/choice() subset of
+    # random.Random used here. It is cheap to create (random.Random(seed)
+    # costs several microseconds), so each move gets its own generator.
+
+    __slots__ = ('state',)
+
+    def __init__(self, seed):
+        self.state = seed & MASK64
+
+    def _next(self):
+        self.state = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def random(self):
+        return (self._next() >> 11) / (1 << 53)
+
+    def choice(self, seq):
+        return seq[self._next() % len(seq)]
+
+
+def move_random(seed, ply):
+    # The generator for one move of a seeded game. It depends only on the
+    # seed and the number of stones on the board, so replaying a position
+    # gives the same move.
+    return MoveRandom(seed << 16 | ply)
+
+
+def search_depth(geometry):
+    # Depth limit for hard mode on boards other than the classic 3x3. The
+    # move deadline usually stops iterative deepening well before this.
+    if geometry.cells <= 16:
+        return 8
+    if geometry.cells <= 25:
+        return 6
+    return 4
+
 
 class TicTacToeGame:
-    def __init__(self, board, human_player, ai_player, current_player, difficulty, game_active, winner):
+    def __init__(self, board, human_player, ai_player, current_player, difficulty, game_active, winner,
+                 board_size=3, win_length=3, time_limit=None, rng=None, seed=None):
         self.board = board
         self.human_player = human_player
         self.ai_player = ai_player
@@ -9,6 +65,17 @@ class TicTacToeGame:
         self.difficulty = difficulty
         self.game_active = game_active
         self.winner = winner
+        self.geometry = get_geometry(board_size, win_length)
+        self.is_classic = board_size == 3 and win_length == 3
+        # Seconds hard mode may spend searching; None means no limit
+        self.time_limit = time_limit
+        # SearchResult of the last hard move, for reporting depth and nodes
+        self.last_search = None
+        # Source of the easy and normal modes' randomness; pass a seeded
+        # random.Random for reproducible games
+        self.rng = rng or random
+        # With a seed, each move draws from move_random(seed, ply) instead
+        self.seed = seed
 
     def make_move(self, index, player):
         if self.board[index] != '' or not self.game_active:
@@ -17,21 +84,20 @@ class TicTacToeGame:
         return True
 
     def check_win(self, player):
-        winning_combinations = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
-        for combination in winning_combinations:
-            if all(self.board[i] == player for i in combination):
-                return True
-        return False
+        return self._check_win_static(self.board, player)
+
+    def check_win_at(self, index, player):
+        # Only the lines through index are checked, so use this right after
+        # player moved there
+        return self.geometry.wins_at(encode(self.board, player), index)
 
     def is_board_full(self):
-        return all(cell != '' for cell in self.board)
+        return '' not in self.board
 
     def get_ai_move(self):
         available_moves = [i for i, cell in enumerate(self.board) if cell == '']
+        if self.seed is not None:
+            self.rng = move_random(self.seed, len(self.board) - len(available_moves))
 
         if self.difficulty == 'easy':
             return self._get_easy_move(available_moves)
@@ -41,51 +107,70 @@ class TicTacToeGame:
             return self._get_hard_move()
 
     def _get_easy_move(self, available_moves):
-        if random.random() < 0.2:
+        if self.rng.random() < 0.2:
             return self._get_smart_move(available_moves)
-        return random.choice(available_moves)
+        return self.rng.choice(available_moves)
 
     def _get_normal_move(self, available_moves):
-        if random.random() < 0.7:
+        if self.rng.random() < 0.7:
             return self._get_smart_move(available_moves)
-        return random.choice(available_moves)
+        return self.rng.choice(available_moves)
 
     def _get_hard_move(self):
-        return self._minimax_move()
+        if not self.is_classic:
+            deadline = None
+            if self.time_limit is not None:
+                deadline = time.perf_counter() + self.time_limit
+            search = HeuristicSearch(self.geometry, search_depth(self.geometry))
+            self.last_search = search.search(encode(self.board, self.ai_player), encode(self.board, self.human_player), deadline)
+            return self.last_search.move
+
+        # Positions reachable in a real game are answered from the solved
+        # table; custom positions go through the alpha-beta search. Both work
+        # on mover/opponent bits, so any pair of symbols is fine.
+        entry = lookup_best_move(self.board, self.ai_player, self.human_player)
+        if entry is not None:
+            # Solved to the end of the game without searching
+            self.last_search = SearchResult(entry[0], entry[1], 0, 1, self.board.count(''))
+            return entry[0]
+        self.last_search = AlphaBetaSearch(_search_table).search(encode(self.board, self.ai_player), encode(self.board, self.human_player))
+        return self.last_search.move
 
     def _get_smart_move(self, available_moves):
+        geometry = self.geometry
+        mine = encode(self.board, self.ai_player)
+        theirs = encode(self.board, self.human_player)
+        free = ~(mine | theirs) & geometry.full_mask
+
         # Check for winning move
-        for move in available_moves:
-            board_copy = list(self.board)
-            board_copy[move] = self.ai_player
-            if self._check_win_static(board_copy, self.ai_player):
-                return move
+        wins = geometry.threats(mine) & free
+        if wins:
+            return lowest_cell(wins)
 
         # Check for blocking move
-        for move in available_moves:
-            board_copy = list(self.board)
-            board_copy[move] = self.human_player
-            if self._check_win_static(board_copy, self.human_player):
-                return move
+        blocks = geometry.threats(theirs) & free
+        if blocks:
+            return lowest_cell(blocks)
 
         # Take center
-        if 4 in available_moves:
-            return 4
+        center = geometry.center_order[0]
+        if free >> center & 1:
+            return center
 
         # Take corner
-        corners = [0, 2, 6, 8]
-        available_corners = [move for move in available_moves if move in corners]
-        if available_corners:
-            return random.choice(available_corners)
+        corners = free & geometry.corner_mask
+        if corners:
+            return self.rng.choice(cells_of(corners))
 
         # Take edge
-        edges = [1, 3, 5, 7]
-        available_edges = [move for move in available_moves if move in edges]
-        if available_edges:
-            return random.choice(available_edges)
+        edges = free & geometry.edge_mask
+        if edges:
+            return self.rng.choice(cells_of(edges))
 
-        return random.choice(available_moves)
+        return self.rng.choice(available_moves)
 
+    # Plain minimax, no longer used for play: kept as the reference the
+    # solved table and the searches are tested and benchmarked against
     def _minimax_move(self):
         best_score = -float('inf')
         best_move = 0
@@ -130,15 +215,9 @@ class TicTacToeGame:
             return best_score
 
     def _check_win_static(self, board, player):
-        winning_combinations = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
-        for combination in winning_combinations:
-            if all(board[i] == player for i in combination):
-                return True
-        return False
+        if self.is_classic:
+            return is_win(encode(board, player))
+        return self.geometry.has_win(encode(board, player))
 
     def _is_board_full_static(self, board):
-        return all(cell != '' for cell in board)
+        return '' not in board
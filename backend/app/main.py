@@ -1,12 +1,81 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import itertools
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
-from .database import get_db_connection, create_table
-from .game_logic import TicTacToeGame
-import json
+
+from .batch import BatchSolver, search_seconds
+from .database import (
+    EMPTY_CELL,
+    GAME_COLUMNS,
+    TURN_COLUMNS,
+    archive_finished_games,
+    close_pool,
+    fetch_archived_game,
+    fetch_game,
+    fetch_moves,
+    fetch_stats,
+    init_pool,
+    insert_game,
+    migrate,
+    ping_database,
+    save_games,
+    transaction,
+    write_moves,
+    write_turn,
+)
+from .engine_pool import EnginePool
+from .game_cache import GameCache
+from .game_logic import DIFFICULTIES, TicTacToeGame
+from .metrics import RequestMetricsMiddleware, observe_search
+from .move_cache import (
+    canonical_board,
+    canonical_position,
+    is_cacheable,
+    make_move_cache,
+)
+from .profiling import ProfilingMiddleware, RequestProfiler
+from .sessions import GameSession, choose_ai_move, parse_move
+from .solver import get_solved_table
+from .startup import Startup
+from .stats import StatsCache, leaderboard, summarize
+from .wire import Board, dumps, respond
 
 app = FastAPI()
 
+# Active game state, read from memory and written back in batches
+game_cache = GameCache(writer=save_games)
+# Worker processes for AI searches
+engine_pool = EnginePool()
+# Hard-mode replies by canonical position, optionally shared between workers
+move_cache = make_move_cache()
+# Opt-in CPU profiles of individual requests
+profiler = RequestProfiler()
+# Games being played over a WebSocket in this process, by id
+sessions = {}
+# Finished-game aggregates, refreshed from the database every few seconds
+stats_cache = StatsCache(fetch=lambda: fetch_stats())
+# Startup phases and readiness of this process
+startup = Startup()
+
 origins = [
     "http://localhost:3000",  # Frontend URL
 ]
@@ -18,15 +87,103 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+app.add_middleware(RequestMetricsMiddleware)
 
-# Ensure table is created on startup
+# Finished games untouched for this many seconds move to games_archive;
+# 0 turns archiving off
+GAME_ARCHIVE_AFTER = float(os.getenv("GAME_ARCHIVE_AFTER", "86400"))
+GAME_ARCHIVE_INTERVAL = float(os.getenv("GAME_ARCHIVE_INTERVAL", "3600"))
+GAME_ARCHIVE_BATCH_SIZE = int(os.getenv("GAME_ARCHIVE_BATCH_SIZE", "1000"))
+
+# Set to 0 on workers that should not run migrations, e.g. when a release
+# step runs them once before the workers start
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "1") == "1"
+# Seconds /readyz waits for the database before reporting not ready
+READINESS_DB_TIMEOUT = float(os.getenv("READINESS_DB_TIMEOUT", "1"))
+
+archive_task = None
+warm_up_task = None
+
+async def archive_periodically():
+    while True:
+        try:
+            # Batches keep each transaction short
+            while await archive_finished_games(GAME_ARCHIVE_AFTER, GAME_ARCHIVE_BATCH_SIZE) == GAME_ARCHIVE_BATCH_SIZE:
+                pass
+        except Exception as e:
+            print(f"Error archiving games: {e}")
+        await asyncio.sleep(GAME_ARCHIVE_INTERVAL)
+
+# Open the connection pool and bring the schema up to date before serving;
+# the engine is warmed up in the background, and /readyz reports ready once
+# that is done
 @app.on_event("startup")
 async def startup_event():
-    create_table()
+    global archive_task, warm_up_task
+    # CPU time used before startup began, nearly all of it imports
+    startup.record("import", time.process_time())
+    with startup.phase("pool"):
+        await init_pool()
+    if DB_MIGRATE_ON_STARTUP:
+        with startup.phase("migrate"):
+            await migrate()
+    game_cache.start()
+    engine_pool.start()
+    if GAME_ARCHIVE_AFTER > 0:
+        archive_task = asyncio.create_task(archive_periodically())
+    warm_up_task = asyncio.create_task(warm_up())
+
+async def warm_up():
+    # Builds the hard-mode lookup table and starts the engine workers, which
+    # build their own, at the same time. A failed phase is reported but does
+    # not keep the process from serving: searches fall back to this process.
+    async def solved_table():
+        with startup.phase("solved_table"):
+            await run_in_threadpool(get_solved_table)
+
+    async def engine_workers():
+        with startup.phase("engine_workers"):
+            await engine_pool.warm()
+
+    with startup.phase("warm_up"):
+        await asyncio.gather(solved_table(), engine_workers(), return_exceptions=True)
+    startup.ready = True
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    global archive_task, warm_up_task
+    for task in (archive_task, warm_up_task):
+        if task is not None:
+            task.cancel()
+    archive_task = warm_up_task = None
+    startup.ready = False
+    # Flush pending game writes before the pool goes away
+    await game_cache.stop()
+    await close_pool()
+    await move_cache.close()
+    engine_pool.stop()
+
+MAX_BOARD_SIZE = 15
+# Game seeds are stored in an INTEGER column
+MAX_SEED = 2**31 - 1
+
+# Time hard mode may spend on one move; requests can ask for less or more,
+# up to the maximum
+AI_MOVE_DEADLINE_MS = float(os.getenv("AI_MOVE_DEADLINE_MS", "50"))
+MAX_AI_MOVE_DEADLINE_MS = float(os.getenv("MAX_AI_MOVE_DEADLINE_MS", "1000"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+# Positions per engine pool task when solving a batch
+BATCH_CHUNK_SIZE = 256
+# Worst-case search time one batch may ask for: each hard position on a
+# larger board counts its full deadline
+MAX_BATCH_SEARCH_SECONDS = float(os.getenv("MAX_BATCH_SEARCH_SECONDS", "60"))
 
 class Game(BaseModel):
     id: int | None = None
-    board: list[str]
+    board: Board
+    board_size: int = 3
+    win_length: int = 3
     human_player: str
     ai_player: str
     current_player: str
@@ -35,89 +192,536 @@ class Game(BaseModel):
     winner: str | None = None
     score_x: int = 0
     score_o: int = 0
+    # Seeds the easy and normal modes' random choices, so a position always
+    # gets the same reply; assigned when the game is created
+    seed: int | None = None
+    # Version of the stored row, bumped by every write; set by the server
+    version: int = 0
 
-@app.post("/games", response_model=Game)
-def create_game(game: Game):
-    conn = None
+class SearchInfo(BaseModel):
+    depth: int
+    nodes: int
+    elapsed_ms: float
+    table_hits: int = 0
+    # True when the move came from the move cache without a search
+    cached: bool = False
+
+class AiMoveResult(Game):
+    search: SearchInfo | None = None
+
+class BatchPosition(BaseModel):
+    board: Board
+    human_player: str
+    ai_player: str
+    difficulty: str
+    board_size: int = 3
+    win_length: int = 3
+    seed: int | None = None
+
+class BatchMoveRequest(BaseModel):
+    positions: list[BatchPosition]
+
+class BatchMoveResult(BaseModel):
+    move: int | None
+    winner: str | None
+    game_active: bool
+
+class BatchMoveResponse(BaseModel):
+    results: list[BatchMoveResult]
+    solved: int
+    duplicates: int
+
+@contextmanager
+def internal_errors(action: str):
+    # Anything but an HTTPException raised in the block becomes a 500 that
+    # says what failed
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO games (board, human_player, ai_player, current_player, difficulty, game_active, winner, score_x, score_o) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
-            (json.dumps(game.board), game.human_player, game.ai_player, game.current_player, game.difficulty, game.game_active, game.winner, game.score_x, game.score_o)
-        )
-        game.id = cur.fetchone()[0]
-        conn.commit()
-        return game
+        yield
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating game: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        raise HTTPException(status_code=500, detail=f"Error {action}: {e}")
+
+def validate_dimensions(game: Game | BatchPosition):
+    if not 3 <= game.board_size <= MAX_BOARD_SIZE:
+        raise HTTPException(status_code=400, detail=f"board_size must be between 3 and {MAX_BOARD_SIZE}")
+    if not 3 <= game.win_length <= game.board_size:
+        raise HTTPException(status_code=400, detail="win_length must be between 3 and board_size")
+    if len(game.board) != game.board_size * game.board_size:
+        raise HTTPException(status_code=400, detail="board must have board_size * board_size cells")
+    # Boards are stored one character per cell
+    players = (game.human_player, game.ai_player)
+    if any(len(player) != 1 or player == EMPTY_CELL for player in players) or game.human_player == game.ai_player:
+        raise HTTPException(status_code=400, detail=f"players must be two different single characters other than '{EMPTY_CELL}'")
+    if isinstance(game, Game) and game.current_player not in players:
+        raise HTTPException(status_code=400, detail="current_player must be human_player or ai_player")
+    if game.difficulty not in DIFFICULTIES:
+        raise HTTPException(status_code=400, detail=f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+    if any(cell != '' and cell not in players for cell in game.board):
+        raise HTTPException(status_code=400, detail="board cells must be empty or a player's symbol")
+    if game.seed is not None and not 0 <= game.seed <= MAX_SEED:
+        raise HTTPException(status_code=400, detail=f"seed must be between 0 and {MAX_SEED}")
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process is up and its event loop answers
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    # Readiness: startup and warm-up are done, the engine pool is not broken
+    # and the database answers
+    state = startup.state()
+    if engine_pool.restart_if_broken():
+        # Not ready for this probe; the replacement's workers start on demand
+        state["ready"] = False
+        state["engine_pool"] = "restarted after a worker died"
+    if startup.ready:
+        try:
+            await asyncio.wait_for(ping_database(), READINESS_DB_TIMEOUT)
+            state["database"] = "ok"
+        except Exception as e:
+            state["ready"] = False
+            state["database"] = f"unavailable: {e or type(e).__name__}"
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+class StatsRecord(BaseModel):
+    games: int
+    human_wins: int
+    ai_wins: int
+    ties: int
+    human_win_rate: float
+
+class Stats(BaseModel):
+    total: StatsRecord
+    by_difficulty: dict[str, StatsRecord]
+    # Keyed by "{size}x{size}/{win_length}"
+    by_board: dict[str, StatsRecord]
+
+class LeaderboardEntry(BaseModel):
+    player: str
+    games: int
+    wins: int
+    losses: int
+    ties: int
+    win_rate: float
+
+async def stats_rows():
+    with internal_errors("retrieving stats"):
+        return await stats_cache.rows()
+
+@app.get("/stats", response_model=Stats)
+async def get_stats():
+    return summarize(await stats_rows())
+
+@app.get("/leaderboard", response_model=list[LeaderboardEntry])
+async def get_leaderboard():
+    return leaderboard(await stats_rows())
+
+class ProfilingSettings(BaseModel):
+    sample_rate: float
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    # The profiling endpoints do not exist unless an admin token is configured
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.authorized(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def get_profile_report(report_id: int):
+    report = profiler.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile report not found")
+    return report
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+def get_profiling():
+    return {"sample_rate": profiler.sample_rate, "reports": profiler.summaries()}
+
+@app.put("/admin/profiling", dependencies=[Depends(require_admin)])
+def update_profiling(settings: ProfilingSettings):
+    if not 0 <= settings.sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate must be between 0 and 1")
+    profiler.sample_rate = settings.sample_rate
+    return {"sample_rate": profiler.sample_rate}
+
+@app.get("/admin/profiling/reports/{report_id}", dependencies=[Depends(require_admin)])
+def get_profiling_report(report_id: int):
+    report = get_profile_report(report_id)
+    return {key: value for key, value in report.items() if key not in ("collapsed", "pstats")}
+
+@app.get("/admin/profiling/reports/{report_id}/collapsed", dependencies=[Depends(require_admin)])
+def get_profiling_report_stacks(report_id: int):
+    # Collapsed stacks for flamegraph.pl or speedscope
+    return PlainTextResponse(get_profile_report(report_id)["collapsed"])
+
+@app.get("/admin/profiling/reports/{report_id}/pstats", dependencies=[Depends(require_admin)])
+def get_profiling_report_pstats(report_id: int):
+    return Response(
+        get_profile_report(report_id)["pstats"],
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{report_id}.pstats"'}
+    )
+
+@app.post("/games", response_model=Game)
+async def create_game(game: Game, request: Request):
+    validate_dimensions(game)
+    if game.seed is None:
+        game.seed = random.randint(0, MAX_SEED)
+    game.version = 0
+    with internal_errors("creating game"):
+        data = game.model_dump()
+        data["id"] = game.id = await insert_game(data)
+        game_cache.put(game.id, data)
+        return respond(request, data)
 
 @app.get("/games/{game_id}", response_model=Game)
-def get_game(game_id: int):
-    conn = None
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT id, board, human_player, ai_player, current_player, difficulty, game_active, winner, score_x, score_o FROM games WHERE id = %s", (game_id,))
-        game_data = cur.fetchone()
+async def get_game(game_id: int, request: Request):
+    # Cached and stored games are already valid, so they are returned as
+    # dicts and only serialized
+    game_data = game_cache.get(game_id)
+    if game_data is not None:
+        return respond(request, game_data)
+    with internal_errors("retrieving game"):
+        game_data = await fetch_game(game_id)
+        if game_data:
+            game_cache.put(game_id, game_data)
+        else:
+            # Not cached: the cache only holds games that can still be written
+            game_data = await fetch_archived_game(game_id)
+    if not game_data:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return respond(request, game_data)
+
+@app.put("/games/{game_id}", response_model=Game)
+async def update_game(game_id: int, game: Game, request: Request):
+    validate_dimensions(game)
+    with internal_errors("updating game"):
+        previous = await load_previous(game_id, game)
+        data = game.model_dump()
+        await write_game_state(game_id, previous, data)
+        return respond(request, data)
+
+FIXED_COLUMNS = tuple(column for column in GAME_COLUMNS if column not in TURN_COLUMNS)
+
+async def load_previous(game_id: int, game: Game):
+    # The stored state a request is about to replace. Checked before the
+    # write, which would otherwise be cached for a row that does not exist.
+    previous = game_cache.get(game_id) or await fetch_game(game_id)
+    if not previous:
+        await reject_archived(game_id)
+        raise HTTPException(status_code=404, detail="Game not found")
+    if game.seed is None:
+        # Clients that do not know about seeds keep the game's own
+        game.seed = previous.get("seed")
+    # Only a turn's columns are written; a new difficulty or board is a new game
+    changed = [column for column in FIXED_COLUMNS if getattr(game, column) != previous[column]]
+    if changed:
+        raise HTTPException(status_code=409, detail=f"{', '.join(changed)} cannot change after a game is created")
+    # The state written back replaces previous
+    game.version = previous["version"] + 1
+    return previous
+
+async def reject_archived(game_id: int):
+    # A game missing from games may have been archived: finished and read
+    # only, so a write to it would match no row and be lost
+    if await fetch_archived_game(game_id):
+        raise HTTPException(status_code=409, detail="Game is archived and can no longer change")
+
+async def write_game_state(game_id: int, previous: dict, data: dict):
+    game_cache.write(game_id, {**data, "id": game_id}, new_moves(previous, data))
+    # Finished games are written straight away; the rest are coalesced
+    # and written by the periodic flush
+    write_now = not data["game_active"] or not game_cache.enabled
+    if write_now and not await game_cache.flush_game(game_id):
+        raise HTTPException(status_code=409, detail="Game was changed by another request; reload it")
+
+def new_moves(previous: dict, game: dict):
+    # (ply, cell, player) for each cell filled since previous, in play order:
+    # whoever was to move in previous goes first, then the players alternate
+    filled = [i for i, cell in enumerate(previous["board"]) if cell != '']
+    added = [i for i, (old, new) in enumerate(zip(previous["board"], game["board"])) if old == '' and new != '']
+    first = [i for i in added if game["board"][i] == previous["current_player"]]
+    second = [i for i in added if game["board"][i] != previous["current_player"]]
+    order = [i for pair in itertools.zip_longest(first, second) for i in pair if i is not None]
+    return [(len(filled) + ply, cell, game["board"][cell]) for ply, cell in enumerate(order, start=1)]
+
+class MoveRecord(BaseModel):
+    ply: int
+    cell: int
+    player: str
+
+class Replay(BaseModel):
+    game_id: int
+    ply: int
+    total_plies: int
+    board: list[str]
+    moves: list[MoveRecord]
+
+@app.get("/games/{game_id}/replay", response_model=Replay)
+async def replay_game(game_id: int, ply: int | None = Query(None, ge=0)):
+    # The board after the first ply moves (all of them by default), rebuilt
+    # from the move log. Games started before moves were logged replay only
+    # the moves made since.
+    with internal_errors("replaying game"):
+        # Moves still waiting in the cache belong in the log first
+        await game_cache.flush_game(game_id)
+        game_data = game_cache.get(game_id) or await fetch_game(game_id) or await fetch_archived_game(game_id)
         if not game_data:
             raise HTTPException(status_code=404, detail="Game not found")
-        return Game(
-            id=game_data[0],
-            board=json.loads(game_data[1]),
-            human_player=game_data[2],
-            ai_player=game_data[3],
-            current_player=game_data[4],
-            difficulty=game_data[5],
-            game_active=game_data[6],
-            winner=game_data[7],
-            score_x=game_data[8],
-            score_o=game_data[9]
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving game: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        moves = await fetch_moves(game_id)
+    if ply is None:
+        ply = len(moves)
+    if ply > len(moves):
+        raise HTTPException(status_code=400, detail=f"Game has {len(moves)} plies")
+    board = [''] * (game_data["board_size"] * game_data["board_size"])
+    for move in moves[:ply]:
+        board[move["cell"]] = move["player"]
+    return Replay(game_id=game_id, ply=ply, total_plies=len(moves), board=board, moves=moves[:ply])
 
-@app.put("/games/{game_id}", response_model=Game)
-def update_game(game_id: int, game: Game):
-    conn = None
+class MoveRequest(BaseModel):
+    # Cell the human plays; leave out when it is the AI's turn to move
+    cell: int | None = None
+
+def resolve_deadline(deadline_ms: float | None):
+    if deadline_ms is None:
+        deadline_ms = AI_MOVE_DEADLINE_MS
+    return max(1.0, min(deadline_ms, MAX_AI_MOVE_DEADLINE_MS))
+
+@app.post("/games/{game_id}/moves", response_model=AiMoveResult)
+async def make_move_endpoint(game_id: int, move: MoveRequest, request: Request, deadline_ms: float | None = None):
+    deadline_ms = resolve_deadline(deadline_ms)
+    with internal_errors("making move"):
+        # A write still waiting in the cache is newer than the row
+        await game_cache.flush_game(game_id)
+        game_data = await fetch_game(game_id)
+        if not game_data:
+            await reject_archived(game_id)
+            raise HTTPException(status_code=404, detail="Game not found")
+        game = Game(**game_data)
+        validate_move(game, move.cell)
+        game.version += 1
+        # No connection or row lock is held during the search; the turn is
+        # only written if no other request wrote the game in the meantime
+        result = await play_ai_turn(game, deadline_ms, move.cell)
+        data = result.model_dump(exclude={"search"})
+        async with transaction("move") as conn:
+            if not await write_turn(conn, game_id, data, game_data["version"]):
+                raise HTTPException(status_code=409, detail="Game was changed by another request; reload it")
+            await write_moves(conn, [(game_id, *m) for m in new_moves(game_data, data)])
+    game_cache.put(game_id, data)
+    if result.search is not None:
+        observe_search(game.difficulty, result.search)
+    return respond(request, result)
+
+def validate_move(game: Game, cell: int | None):
+    if not game.game_active:
+        raise HTTPException(status_code=409, detail="Game is over")
+    if cell is None:
+        if game.current_player != game.ai_player:
+            raise HTTPException(status_code=409, detail="It is the human player's turn; send a cell")
+        return
+    if game.current_player != game.human_player:
+        raise HTTPException(status_code=409, detail="It is not the human player's turn")
+    if not 0 <= cell < len(game.board):
+        raise HTTPException(status_code=400, detail="cell is out of range")
+    if game.board[cell] != '':
+        raise HTTPException(status_code=409, detail="Cell is already taken")
+
+# Open game sockets allowed per process; more are refused with 1013
+WS_MAX_SESSIONS = int(os.getenv("WS_MAX_SESSIONS", "10000"))
+# Seconds a game socket may go without a message before it is closed
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "600"))
+
+@app.websocket("/games/{game_id}/ws")
+async def game_socket(websocket: WebSocket, game_id: int, deadline_ms: float | None = None):
+    # Plays a game over one connection. The server keeps the game state;
+    # the client sends cells and gets back only the moves made and the new
+    # status. State is persisted through the write-behind cache.
+    # Accepted before any refusal: a close sent before the handshake reaches
+    # the client as a bare HTTP 403, without the close code
+    await websocket.accept()
+    if len(sessions) >= WS_MAX_SESSIONS:
+        await websocket.close(code=1013, reason="Too many open games")
+        return
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE games SET board = %s, human_player = %s, ai_player = %s, current_player = %s, difficulty = %s, game_active = %s, winner = %s, score_x = %s, score_o = %s WHERE id = %s",
-            (json.dumps(game.board), game.human_player, game.ai_player, game.current_player, game.difficulty, game.game_active, game.winner, game.score_x, game.score_o, game_id)
-        )
-        conn.commit()
-        return game
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error updating game: {e}")
+        with internal_errors("loading game"):
+            # Archived games are finished, so they open read-only
+            game_data = game_cache.get(game_id) or await fetch_game(game_id) or await fetch_archived_game(game_id)
+    except HTTPException:
+        await websocket.close(code=1011, reason="Error loading game")
+        return
+    if not game_data:
+        await websocket.close(code=4404, reason="Game not found")
+        return
+    if game_id in sessions:
+        await websocket.close(code=4409, reason="Game is already open on another connection")
+        return
+    session = sessions[game_id] = GameSession(game_id, game_data, resolve_deadline(deadline_ms) / 1000)
+
+    try:
+        await websocket.send_text(dumps({"type": "state", "game": session.state()}).decode())
+        while True:
+            text = await asyncio.wait_for(websocket.receive_text(), WS_IDLE_TIMEOUT)
+            try:
+                moves = await play_session_turn(session, parse_move(text))
+            except HTTPException as e:
+                await websocket.send_text(dumps({"type": "error", "status": e.status_code, "detail": e.detail}).decode())
+                continue
+            session.version += 1
+            game_cache.write(game_id, session.state(), moves)
+            await websocket.send_text(dumps({"type": "move", "moves": moves, **session.status()}).decode())
+            # Finished games are written straight away, after the reply
+            write_now = not session.game.game_active or not game_cache.enabled
+            if write_now and not await game_cache.flush_game(game_id):
+                await websocket.close(code=4409, reason="Game was changed by another connection")
+                return
+    except TimeoutError:
+        await websocket.close(code=1000, reason="Idle timeout")
+    except WebSocketDisconnect:
+        pass
     finally:
-        if conn:
-            cur.close()
-            conn.close()
+        sessions.pop(game_id, None)
+
+async def play_session_turn(session: GameSession, cell: int | None):
+    # The human's move if cell is given, then the AI's reply while the game
+    # is still on. Returns the (ply, cell, player) moves made.
+    game = session.game
+    validate_move(game, cell)
+    moves = []
+    if cell is not None:
+        moves.append(session.play(cell, game.human_player))
+    if game.game_active:
+        try:
+            move, search = await run_engine(game.difficulty, choose_ai_move, *session.search_args())
+        except Exception:
+            # Nothing is written or sent for a failed turn, so the human's
+            # move is taken back and can be sent again
+            if moves:
+                session.undo(moves[0])
+            raise
+        observe_search(game.difficulty, SearchInfo(**search))
+        moves.append(session.play(move, game.ai_player))
+    return moves
+
+@app.post("/ai-move", response_model=AiMoveResult)
+async def ai_move_endpoint(game: Game, request: Request, deadline_ms: float | None = None):
+    # Games with an id are stored with the reply: the frontend sends its own
+    # moves with PUT, so this is where wins, ties and the AI's moves are
+    # written. Games without one are played statelessly.
+    validate_dimensions(game)
+    game_id = game.id
+    with internal_errors("retrieving game"):
+        previous = await load_previous(game_id, game) if game_id is not None else None
+    if move_cache.enabled and is_cacheable(game):
+        result = await cached_ai_turn(game)
+    else:
+        result = await play_ai_turn(game, resolve_deadline(deadline_ms))
+        if result.search is not None:
+            observe_search(game.difficulty, result.search)
+    if previous is not None:
+        with internal_errors("updating game"):
+            await write_game_state(game_id, previous, result.model_dump(exclude={"search"}))
+    return respond(request, result)
 
-@app.post("/ai-move", response_model=Game)
-def ai_move_endpoint(game: Game):
+# Easy and normal moves take microseconds, much less than a round trip to a
+# worker process, so they are played in the web process
+INLINE_DIFFICULTIES = ('easy', 'normal')
+
+async def run_engine(difficulty: str, fn, *args):
+    # The search is CPU-bound, so anything slower runs in a worker process
+    if difficulty in INLINE_DIFFICULTIES:
+        return fn(*args)
+    return await engine_pool.run(fn, *args)
+
+async def cached_ai_turn(game: Game):
+    # The move is looked up, or searched and stored, for the canonical
+    # orientation of the position and mapped back to the game's
+    key, symmetry = canonical_position(game.board, game.ai_player, game.human_player)
+    start = time.perf_counter()
+    move = await move_cache.get(key)
+    if move is None:
+        move, search = await engine_pool.run(choose_ai_move, canonical_board(key), 'X', 'O', 'hard', 3, 3, None)
+        await move_cache.set(key, move)
+        search = SearchInfo(**search)
+        observe_search(game.difficulty, search)
+    else:
+        search = SearchInfo(depth=0, nodes=0, elapsed_ms=round((time.perf_counter() - start) * 1000, 3), cached=True)
+    return await play_ai_turn(game, 0, ai_move=symmetry[move], search=search)
+
+@app.post("/ai-move/batch", response_model=BatchMoveResponse)
+async def batch_ai_move_endpoint(request: BatchMoveRequest, deadline_ms: float | None = None, stream: bool = False):
+    # The AI's reply for many positions at once. Identical hard-mode
+    # positions are solved once. With stream=true the results are sent as
+    # NDJSON lines, in request order, as they are computed.
+    if len(request.positions) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} positions per batch")
+    for index, position in enumerate(request.positions):
+        try:
+            validate_dimensions(position)
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"positions[{index}]: {e.detail}")
+
+    time_limit = resolve_deadline(deadline_ms) / 1000
+    seconds = sum(search_seconds(position, time_limit) for position in request.positions)
+    if seconds > MAX_BATCH_SEARCH_SECONDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch may search for up to {seconds:.0f} s, more than {MAX_BATCH_SEARCH_SECONDS:.0f} s; "
+                   "split it or lower deadline_ms"
+        )
+
+    solver = BatchSolver(time_limit)
+    if stream:
+        return StreamingResponse(stream_batch(solver, request.positions), media_type="application/x-ndjson")
+    results = []
+    async for chunk in solve_batch(solver, request.positions):
+        results.extend(chunk)
+    return BatchMoveResponse(results=results, solved=solver.solved, duplicates=solver.duplicates)
+
+def solve_batch(solver: BatchSolver, positions: list[BatchPosition]):
+    # Chunks go to the engine pool, one per worker at a time, and each stays
+    # well inside the pool's task timeout however many larger-board searches
+    # the batch holds
+    return solver.stream(positions, engine_pool.run, BATCH_CHUNK_SIZE, engine_pool.timeout / 2,
+                         window=max(1, engine_pool.workers))
+
+async def stream_batch(solver: BatchSolver, positions: list[BatchPosition]):
+    async for results in solve_batch(solver, positions):
+        yield b"".join(dumps(result) + b"\n" for result in results)
+
+async def play_ai_turn(game: Game, deadline_ms: float, human_move: int | None = None,
+                       ai_move: int | None = None, search: SearchInfo | None = None):
+    # Applies human_move if given, then lets the AI reply when the game is
+    # still on. ai_move, with the search that found it, skips the AI's search;
+    # otherwise only the search goes through run_engine, so workers never
+    # import this module. game is this turn's own copy, parsed from the
+    # request, so its board is played on in place
     game_instance = TicTacToeGame(
-        board=list(game.board),
+        board=game.board,
         human_player=game.human_player,
         ai_player=game.ai_player,
         current_player=game.current_player,
         difficulty=game.difficulty,
         game_active=game.game_active,
-        winner=game.winner
+        winner=game.winner,
+        board_size=game.board_size,
+        win_length=game.win_length,
+        time_limit=deadline_ms / 1000,
+        seed=game.seed
     )
+    if human_move is not None:
+        game_instance.make_move(human_move, game_instance.human_player)
+        human_won = game_instance.check_win_at(human_move, game_instance.human_player)
+    else:
+        human_won = game_instance.check_win(game_instance.human_player)
 
     # Check if human player won or it's a tie after their move
-    if game_instance.check_win(game_instance.human_player):
+    if human_won:
         game.game_active = False
         game.winner = game_instance.human_player
         if game_instance.human_player == 'X':
@@ -129,11 +733,22 @@ def ai_move_endpoint(game: Game):
         game.winner = "tie"
 
     # Only allow AI to move if the game is still active
+    if game.game_active and ai_move is not None:
+        best_move = ai_move
+    elif game.game_active:
+        # Easy and normal moves do not search, so they report no nodes
+        best_move, search = await run_engine(
+            game.difficulty, choose_ai_move, game_instance.board, game.human_player, game.ai_player,
+            game.difficulty, game.board_size, game.win_length, deadline_ms / 1000, game.seed
+        )
+        search = SearchInfo(**search)
+    else:
+        search = None
+
     if game.game_active:
-        best_move = game_instance.get_ai_move()
         game_instance.make_move(best_move, game_instance.ai_player)
 
-        if game_instance.check_win(game_instance.ai_player):
+        if game_instance.check_win_at(best_move, game_instance.ai_player):
             game.game_active = False
             game.winner = game_instance.ai_player
             if game_instance.ai_player == 'X':
@@ -147,8 +762,6 @@ def ai_move_endpoint(game: Game):
             game_instance.current_player = game_instance.human_player
 
     game.board = game_instance.board
-    game.game_active = game_instance.game_active
-    game.winner = game_instance.winner
     game.current_player = game_instance.current_player
 
-    return game
+    return AiMoveResult(**game.model_dump(), search=search)
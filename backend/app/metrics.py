@@ -0,0 +1,159 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Database connection pool
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check out a database connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Open database connections in the pool",
+    ["state"],
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a free connection",
+)
+
+# Hot-game cache
+GAME_CACHE_REQUESTS = Counter(
+    "game_cache_requests_total",
+    "Game cache lookups by result",
+    ["result"],
+)
+GAME_CACHE_FLUSHED_ROWS = Counter(
+    "game_cache_flushed_rows_total",
+    "Game rows written to the database by write-behind flushes",
+)
+GAME_CACHE_CONFLICTS = Counter(
+    "game_cache_conflicts_total",
+    "Cached game writes dropped because another process wrote the game first",
+)
+GAME_CACHE_DIRTY = Gauge(
+    "game_cache_dirty_games",
+    "Games with writes not yet flushed to the database",
+)
+
+# Process startup
+STARTUP_PHASE_SECONDS = Gauge(
+    "startup_phase_seconds",
+    "Time each startup phase of this process took",
+    ["phase"],
+)
+
+# /ai-move cache of hard-mode replies by canonical position
+MOVE_CACHE_LOOKUPS = Counter(
+    "move_cache_lookups_total",
+    "AI move cache lookups by result: local_hit, shared_hit, miss or error",
+    ["result"],
+)
+MOVE_CACHE_ENTRIES = Gauge(
+    "move_cache_entries",
+    "Positions held in this process's AI move cache",
+)
+
+# AI engine process pool
+ENGINE_POOL_QUEUE_DEPTH = Gauge(
+    "engine_pool_queue_depth",
+    "AI searches submitted to the process pool and not finished yet",
+)
+ENGINE_POOL_TASK_SECONDS = Histogram(
+    "engine_pool_task_seconds",
+    "Time from submitting an AI search to the process pool to its result",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+ENGINE_POOL_FALLBACKS = Counter(
+    "engine_pool_fallbacks_total",
+    "AI searches run in-process because the pool was saturated or not running",
+)
+ENGINE_POOL_TIMEOUTS = Counter(
+    "engine_pool_timeouts_total",
+    "AI searches that did not finish within the task timeout",
+)
+ENGINE_POOL_RESTARTS = Counter(
+    "engine_pool_restarts_total",
+    "Times the process pool was replaced after a worker died",
+)
+
+# HTTP requests, labelled by route template rather than raw path so ids do
+# not create new series
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Time to handle an HTTP request",
+    ["method", "route", "status"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# Stages of each database operation: acquire (pool checkout), encode and
+# decode (row values to and from the stored board text), execute (query
+# round trip) and commit
+DB_STAGE_SECONDS = Histogram(
+    "db_stage_seconds",
+    "Time spent in each stage of a database operation: acquire, encode/decode of row values, execute, commit",
+    ["operation", "stage"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+
+# AI moves, observed in the web process from the search summary that comes
+# back with each move, so moves made in worker processes are counted too
+ENGINE_SEARCH_SECONDS = Histogram(
+    "engine_search_seconds",
+    "Time the engine spent choosing a move",
+    ["difficulty"],
+    buckets=(0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+ENGINE_SEARCH_NODES = Histogram(
+    "engine_search_nodes",
+    "Positions visited while choosing a move",
+    ["difficulty"],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000, 1000000),
+)
+# hit / (hit + miss) is the solved and transposition table hit rate
+ENGINE_TABLE_LOOKUPS = Counter(
+    "engine_table_lookups_total",
+    "Solved and transposition table lookups by result",
+    ["difficulty", "result"],
+)
+
+
+def observe_search(difficulty, search):
+    # search is the SearchInfo returned with an AI move
+    ENGINE_SEARCH_SECONDS.labels(difficulty).observe(search.elapsed_ms / 1000)
+    ENGINE_SEARCH_NODES.labels(difficulty).observe(search.nodes)
+    # The solved table answers without visiting any node
+    lookups = max(search.nodes, search.table_hits)
+    if lookups:
+        ENGINE_TABLE_LOOKUPS.labels(difficulty, "hit").inc(search.table_hits)
+        ENGINE_TABLE_LOOKUPS.labels(difficulty, "miss").inc(lookups - search.table_hits)
+
+
+class RequestMetricsMiddleware:
+    # Plain ASGI middleware: one histogram observation per request, with no
+    # per-request task or body buffering
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], route.path if route is not None else "unmatched", str(status)
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,144 @@
+# Schema migrations, applied in order by database.migrate(). Each runs in its
+# own transaction and is recorded in schema_migrations; never edit one that
+# has shipped, add a new one instead.
+
+MIGRATIONS = [
+    (1, "create games", [
+        # Also matches tables created before migrations existed
+        """
+        CREATE TABLE IF NOT EXISTS games (
+            id SERIAL PRIMARY KEY,
+            board JSONB NOT NULL,
+            human_player VARCHAR(1) NOT NULL,
+            ai_player VARCHAR(1) NOT NULL,
+            current_player VARCHAR(1) NOT NULL,
+            difficulty VARCHAR(10) NOT NULL,
+            game_active BOOLEAN NOT NULL,
+            winner VARCHAR(1),
+            score_x INTEGER DEFAULT 0,
+            score_o INTEGER DEFAULT 0,
+            board_size INTEGER NOT NULL DEFAULT 3,
+            win_length INTEGER NOT NULL DEFAULT 3
+        )
+        """,
+        "ALTER TABLE games ADD COLUMN IF NOT EXISTS board_size INTEGER NOT NULL DEFAULT 3",
+        "ALTER TABLE games ADD COLUMN IF NOT EXISTS win_length INTEGER NOT NULL DEFAULT 3",
+    ]),
+    (2, "store board as text", [
+        # One character per cell, '.' for empty: 9 bytes for a classic board
+        # instead of a JSONB array, and no JSON parsing on read
+        "ALTER TABLE games ADD COLUMN cells TEXT",
+        """
+        UPDATE games SET cells = (
+            SELECT string_agg(CASE WHEN cell = '' THEN '.' ELSE cell END, '' ORDER BY position)
+            FROM jsonb_array_elements_text(board) WITH ORDINALITY AS t(cell, position)
+        )
+        """,
+        "ALTER TABLE games DROP COLUMN board",
+        "ALTER TABLE games RENAME COLUMN cells TO board",
+        "ALTER TABLE games ALTER COLUMN board SET NOT NULL",
+    ]),
+    (3, "winner can be tie", [
+        "ALTER TABLE games ALTER COLUMN winner TYPE VARCHAR(3)",
+    ]),
+    (4, "index active and finished games", [
+        "ALTER TABLE games ADD COLUMN updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+        # Partial indexes: each covers only its part of the table, so the
+        # active one stays small however many finished games pile up
+        "CREATE INDEX games_active_idx ON games (updated_at) WHERE game_active",
+        "CREATE INDEX games_finished_idx ON games (updated_at) WHERE NOT game_active",
+    ]),
+    (5, "archive finished games", [
+        """
+        CREATE TABLE games_archive (
+            LIKE games INCLUDING DEFAULTS,
+            archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (id)
+        )
+        """,
+    ]),
+    (6, "log moves", [
+        # Append-only history, one row per move; the board in games is kept
+        # as the current state for fast reads
+        """
+        CREATE TABLE moves (
+            game_id INTEGER NOT NULL,
+            ply SMALLINT NOT NULL,
+            cell SMALLINT NOT NULL,
+            player VARCHAR(1) NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (game_id, ply)
+        )
+        """,
+    ]),
+    (7, "game stats", [
+        # Finished games counted by outcome, kept up to date by a trigger so
+        # stats never scan games
+        """
+        CREATE TABLE game_stats (
+            difficulty VARCHAR(10) NOT NULL,
+            board_size INTEGER NOT NULL,
+            win_length INTEGER NOT NULL,
+            human_player VARCHAR(1) NOT NULL,
+            ai_player VARCHAR(1) NOT NULL,
+            outcome VARCHAR(5) NOT NULL,
+            games BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (difficulty, board_size, win_length, human_player, ai_player, outcome)
+        )
+        """,
+        """
+        CREATE FUNCTION game_outcome(winner VARCHAR, human_player VARCHAR) RETURNS VARCHAR AS $$
+            SELECT CASE WHEN winner = 'tie' THEN 'tie' WHEN winner = human_player THEN 'human' ELSE 'ai' END
+        $$ LANGUAGE SQL IMMUTABLE
+        """,
+        """
+        CREATE FUNCTION count_finished_game() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO game_stats (difficulty, board_size, win_length, human_player, ai_player, outcome, games)
+            VALUES (NEW.difficulty, NEW.board_size, NEW.win_length, NEW.human_player, NEW.ai_player,
+                    game_outcome(NEW.winner, NEW.human_player), 1)
+            ON CONFLICT (difficulty, board_size, win_length, human_player, ai_player, outcome)
+            DO UPDATE SET games = game_stats.games + 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        # A game is counted once, when it goes from active to finished, or
+        # when it is inserted already finished (bulk imports)
+        """
+        CREATE TRIGGER games_finished AFTER UPDATE OF game_active ON games
+        FOR EACH ROW WHEN (OLD.game_active AND NOT NEW.game_active AND NEW.winner IS NOT NULL)
+        EXECUTE FUNCTION count_finished_game()
+        """,
+        """
+        CREATE TRIGGER games_inserted_finished AFTER INSERT ON games
+        FOR EACH ROW WHEN (NOT NEW.game_active AND NEW.winner IS NOT NULL)
+        EXECUTE FUNCTION count_finished_game()
+        """,
+        # Games that finished before the triggers existed
+        """
+        INSERT INTO game_stats (difficulty, board_size, win_length, human_player, ai_player, outcome, games)
+        SELECT difficulty, board_size, win_length, human_player, ai_player, game_outcome(winner, human_player), count(*)
+        FROM (
+            SELECT difficulty, board_size, win_length, human_player, ai_player, winner FROM games
+            WHERE NOT game_active AND winner IS NOT NULL
+            UNION ALL
+            SELECT difficulty, board_size, win_length, human_player, ai_player, winner FROM games_archive
+            WHERE NOT game_active AND winner IS NOT NULL
+        ) finished
+        GROUP BY 1, 2, 3, 4, 5, 6
+        """,
+    ]),
+    (8, "game seeds", [
+        # Seeds the easy and normal modes' random choices; games created
+        # before seeds existed keep playing unseeded
+        "ALTER TABLE games ADD COLUMN seed INTEGER",
+        "ALTER TABLE games_archive ADD COLUMN seed INTEGER",
+    ]),
+    (9, "game versions", [
+        # Bumped by every write, so a write based on an older read of the
+        # row can be detected and refused
+        "ALTER TABLE games ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE games_archive ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ]),
+]
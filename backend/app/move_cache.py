@@ -0,0 +1,121 @@
+import os
+from collections import OrderedDict
+
+from .bitboard import FULL_MASK, WINNING, decode, encode
+from .metrics import MOVE_CACHE_ENTRIES, MOVE_CACHE_LOOKUPS
+from .search import PERMUTED, SYMMETRIES
+
+# Positions kept in each process; 0 turns the cache off
+MOVE_CACHE_SIZE = int(os.getenv("MOVE_CACHE_SIZE", "10000"))
+# Optional Redis URL for a cache shared by every worker process; needs the
+# redis package
+MOVE_CACHE_URL = os.getenv("MOVE_CACHE_URL")
+# Seconds an entry lives in the shared cache; Redis evicts beyond that
+# according to its own maxmemory-policy
+MOVE_CACHE_TTL = int(os.getenv("MOVE_CACHE_TTL", "86400"))
+# Bump when the engine's choice of move changes, so shared entries written
+# by older versions are not used
+MOVE_CACHE_PREFIX = "ai-move:v1:"
+
+
+def canonical_position(board, ai_player, human_player):
+    # Returns (key, symmetry): key packs the board as seen by the AI, mover
+    # bits over opponent bits, in its smallest orientation; symmetry[cell]
+    # maps a cell of that orientation back to board
+    mine, theirs = encode(board, ai_player), encode(board, human_player)
+    best, best_index = None, 0
+    for index, table in enumerate(PERMUTED):
+        key = table[mine] << 9 | table[theirs]
+        if best is None or key < best:
+            best, best_index = key, index
+    return best, SYMMETRIES[best_index]
+
+
+def canonical_board(key):
+    # The position for key with the AI as 'O'
+    return decode(key & FULL_MASK, key >> 9)
+
+
+def is_cacheable(game):
+    # Only hard mode on the classic board always gives the same reply; the
+    # position must still be open for the AI to move in
+    if game.difficulty != 'hard' or game.board_size != 3 or game.win_length != 3 or not game.game_active:
+        return False
+    mine, theirs = encode(game.board, game.ai_player), encode(game.board, game.human_player)
+    return not WINNING[mine] and not WINNING[theirs] and mine | theirs != FULL_MASK
+
+
+class MoveCache:
+    # Canonical position -> the AI's move in that orientation. A bounded LRU
+    # in this process, optionally backed by a shared cache that several
+    # worker processes read and fill. Moves are computed on the canonical
+    # board, so the reply for a position never depends on which of its
+    # orientations was asked first.
+
+    def __init__(self, max_size=MOVE_CACHE_SIZE, shared=None, ttl=MOVE_CACHE_TTL, shared_errors=(OSError,)):
+        # shared needs async get(key) and set(key, value, ex=seconds), as in
+        # redis.asyncio; it is only consulted on local misses. shared_errors
+        # are the exceptions it raises when it is unavailable.
+        self.max_size = max_size
+        self.shared = shared
+        self.shared_errors = shared_errors
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        MOVE_CACHE_ENTRIES.set_function(lambda: len(self._entries))
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    async def get(self, key):
+        move = self._entries.get(key)
+        if move is not None:
+            self._entries.move_to_end(key)
+            MOVE_CACHE_LOOKUPS.labels("local_hit").inc()
+            return move
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(f"{MOVE_CACHE_PREFIX}{key}")
+            except self.shared_errors:
+                # A shared cache that is down only costs the searches
+                MOVE_CACHE_LOOKUPS.labels("error").inc()
+            else:
+                if value is not None:
+                    MOVE_CACHE_LOOKUPS.labels("shared_hit").inc()
+                    move = int(value)
+                    self._store(key, move)
+                    return move
+        MOVE_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    async def set(self, key, move):
+        self._store(key, move)
+        if self.shared is not None:
+            try:
+                await self.shared.set(f"{MOVE_CACHE_PREFIX}{key}", move, ex=self.ttl)
+            except self.shared_errors:
+                MOVE_CACHE_LOOKUPS.labels("error").inc()
+
+    def _store(self, key, move):
+        self._entries[key] = move
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def close(self):
+        if self.shared is not None:
+            await self.shared.aclose()
+
+
+def make_move_cache():
+    if MOVE_CACHE_URL:
+        try:
+            import redis.asyncio as redis
+            from redis.exceptions import RedisError
+        except ImportError:
+            raise RuntimeError("MOVE_CACHE_URL is set but the redis package is not installed")
+        return MoveCache(shared=redis.from_url(MOVE_CACHE_URL), shared_errors=(RedisError, OSError))
+    return MoveCache()
@@ -0,0 +1,179 @@
+import hmac
+import io
+import itertools
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+# Opt-in request profiling. Off unless PROFILING_ADMIN_TOKEN is set; then a
+# request sent with X-Profile: 1 and a matching X-Admin-Token is profiled,
+# and the admin endpoints can turn on sampling of a fraction of requests.
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+# Fraction of eligible requests profiled without the header
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_MAX_REPORTS = int(os.getenv("PROFILING_MAX_REPORTS", "50"))
+# Seconds between stack samples for the flamegraph dump
+PROFILING_STACK_INTERVAL = float(os.getenv("PROFILING_STACK_INTERVAL", "0.001"))
+# Only game and AI move requests are profiled
+PROFILED_PATHS = ("/games", "/ai-move")
+TOP_FUNCTIONS = 30
+
+# True while the current request is being profiled; the engine pool then
+# runs the search on this thread so it shows up in the profile
+profiling_request = ContextVar("profiling_request", default=False)
+
+
+class StackSampler:
+    # Samples one thread's Python stack from a background thread and counts
+    # stacks in collapsed form ("outer;inner;leaf count"), which flamegraph.pl
+    # and speedscope read. The GIL limits the effective rate during
+    # CPU-bound work to about one sample per switch interval.
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    # Keeps the profiling settings and the most recent reports in memory.
+    # One request is profiled at a time per process: cProfile records the
+    # whole thread, so other requests on the event loop during the same
+    # window show up in the report too.
+
+    def __init__(self, admin_token=PROFILING_ADMIN_TOKEN, sample_rate=PROFILING_SAMPLE_RATE,
+                 max_reports=PROFILING_MAX_REPORTS, stack_interval=PROFILING_STACK_INTERVAL):
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate if admin_token else 0.0
+        self.stack_interval = stack_interval
+        self.reports = deque(maxlen=max_reports)
+        self._ids = itertools.count(1)
+        self._busy = False
+        self._random = random.Random()
+
+    @property
+    def enabled(self):
+        return bool(self.admin_token)
+
+    def authorized(self, token):
+        # Constant-time, so the token cannot be guessed from response times;
+        # compared as bytes, as headers may hold non-ASCII text
+        return self.enabled and hmac.compare_digest((token or "").encode(), self.admin_token.encode())
+
+    def wants(self, scope):
+        # Cheap check first: nothing to do unless profiling is configured
+        if not self.admin_token or self._busy:
+            return False
+        if not scope["path"].startswith(PROFILED_PATHS):
+            return False
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") == b"1" and self.authorized(headers.get(b"x-admin-token", b"").decode()):
+            return True
+        return self.sample_rate > 0 and self._random.random() < self.sample_rate
+
+    def start(self):
+        # Imported here: profiling is off in most processes, and these
+        # modules need not slow down every worker's startup
+        import cProfile
+
+        self._busy = True
+        profile = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident(), self.stack_interval)
+        sampler.start()
+        profile.enable()
+        return next(self._ids), profile, sampler
+
+    def finish(self, report_id, profile, sampler, request, duration):
+        profile.disable()
+        sampler.stop()
+        self._busy = False
+
+        import pstats
+
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        report = {
+            "id": report_id,
+            "created": time.time(),
+            "duration_ms": round(duration * 1000, 3),
+            **request,
+            "top_functions": out.getvalue(),
+            "collapsed": sampler.collapsed(),
+            # Same format as cProfile's dump_stats, for snakeviz or pstats
+            "pstats": marshal.dumps(stats.stats),
+        }
+        self.reports.append(report)
+        return report
+
+    def get(self, report_id):
+        for report in self.reports:
+            if report["id"] == report_id:
+                return report
+        return None
+
+    def summaries(self):
+        return [
+            {key: report[key] for key in ("id", "created", "duration_ms", "method", "path", "status")}
+            for report in reversed(self.reports)
+        ]
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.wants(scope):
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", str(report_id).encode())]
+            await send(message)
+
+        token = profiling_request.set(True)
+        report_id, profile, sampler = self.profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            profiling_request.reset(token)
+            self.profiler.finish(report_id, profile, sampler, {
+                "method": scope["method"], "path": scope["path"], "status": status
+            }, duration)
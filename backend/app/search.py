@@ -0,0 +1,327 @@
+import time
+from typing import NamedTuple
+
+from .bitboard import FULL_MASK, LEGAL_MOVES, WINNING
+
+# Same priorities as TicTacToeGame._get_smart_move: center, corners, edges
+MOVE_PRIORITY = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+ORDERED_MOVES = tuple(
+    tuple(i for i in MOVE_PRIORITY if i in moves) for moves in LEGAL_MOVES
+)
+
+# The 8 symmetries of the square as cell permutations: 4 rotations, then the
+# same rotations applied after a mirror.
+_ROTATE = (6, 3, 0, 7, 4, 1, 8, 5, 2)
+_MIRROR = (2, 1, 0, 5, 4, 3, 8, 7, 6)
+
+
+def _symmetries():
+    perms = []
+    for start in (tuple(range(9)), _MIRROR):
+        perm = start
+        for _ in range(4):
+            perms.append(perm)
+            perm = tuple(perm[_ROTATE[i]] for i in range(9))
+    return tuple(perms)
+
+
+SYMMETRIES = _symmetries()
+
+
+def _permute(bits, perm):
+    result = 0
+    for i in range(9):
+        if bits >> perm[i] & 1:
+            result |= 1 << i
+    return result
+
+
+PERMUTED = tuple(
+    tuple(_permute(bits, perm) for bits in range(FULL_MASK + 1))
+    for perm in SYMMETRIES
+)
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchResult(NamedTuple):
+    move: int | None
+    score: int
+    nodes: int
+    table_hits: int
+    depth: int = 0
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def canonical_key(mine, theirs):
+    # Smallest packed board over all symmetries, so rotated and reflected
+    # copies of a position share a transposition-table entry.
+    return min((table[mine] << 9) | table[theirs] for table in PERMUTED)
+
+
+def _to_table(score, ply):
+    # Scores carry a depth penalty (10 - ply), which depends on where the
+    # position was reached. Store them as if found at ply 0.
+    if score > 0:
+        return score + ply
+    if score < 0:
+        return score - ply
+    return 0
+
+
+def _from_table(score, ply):
+    if score > 0:
+        return score - ply
+    if score < 0:
+        return score + ply
+    return 0
+
+
+class AlphaBetaSearch:
+    # Negamax with alpha-beta cutoffs and a transposition table keyed by
+    # canonical board. Scores match TicTacToeGame._minimax: 10 - depth for a
+    # win, depth - 10 for a loss, 0 for a draw, from the mover's side.
+
+    def __init__(self, table=None):
+        self.table = {} if table is None else table
+        self.nodes = 0
+        self.table_hits = 0
+
+    def search(self, mine, theirs):
+        self.nodes = 0
+        self.table_hits = 0
+
+        best_move = None
+        best_score = -11
+        alpha = -11
+        for i in ORDERED_MOVES[mine | theirs]:
+            score = self._score_move(mine, theirs, i, 0, alpha, 11)
+            if score > best_score:
+                best_score = score
+                best_move = i
+                alpha = score
+
+        # The 3x3 search always runs to the end of the game
+        depth = 9 - (mine | theirs).bit_count()
+        return SearchResult(best_move, best_score, self.nodes, self.table_hits, depth)
+
+    def _score_move(self, mine, theirs, move, ply, alpha, beta):
+        child = mine | (1 << move)
+        if WINNING[child]:
+            return 10 - ply
+        if WINNING[theirs]:
+            # Only on custom boards where the opponent already holds a line
+            return ply - 10
+        if child | theirs == FULL_MASK:
+            return 0
+        return -self._negamax(theirs, child, ply + 1, -beta, -alpha)
+
+    def _negamax(self, mine, theirs, ply, alpha, beta):
+        self.nodes += 1
+
+        key = canonical_key(mine, theirs)
+        entry = self.table.get(key)
+        if entry is not None:
+            self.table_hits += 1
+            flag, stored = entry
+            score = _from_table(stored, ply)
+            if flag == EXACT:
+                return score
+            if flag == LOWER and score > alpha:
+                alpha = score
+            elif flag == UPPER and score < beta:
+                beta = score
+            if alpha >= beta:
+                return score
+
+        original_alpha = alpha
+        best_score = -11
+        for i in ORDERED_MOVES[mine | theirs]:
+            score = self._score_move(mine, theirs, i, ply, alpha, beta)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (flag, _to_table(best_score, ply))
+        return best_score
+
+
+WIN_SCORE = 10 ** 9
+
+
+def _to_table_score(score, ply):
+    # Same normalisation as _to_table, for the much larger win scores used
+    # by HeuristicSearch; heuristic values never come close to WIN_SCORE.
+    if score > WIN_SCORE // 2:
+        return score + ply
+    if score < -WIN_SCORE // 2:
+        return score - ply
+    return score
+
+
+def _from_table_score(score, ply):
+    if score > WIN_SCORE // 2:
+        return score - ply
+    if score < -WIN_SCORE // 2:
+        return score + ply
+    return score
+
+
+class HeuristicSearch:
+    # Depth-limited negamax with alpha-beta cutoffs for boards other than the
+    # classic 3x3. Leaves are scored by open lines: a window of win_length
+    # cells holding only one player's stones is worth 10^(stones - 1) to that
+    # player. The score is updated per move from the lines through the moved
+    # cell instead of rescanning the board.
+
+    def __init__(self, geometry, max_depth):
+        self.geometry = geometry
+        self.max_depth = max_depth
+        self.deadline = None
+        self.weights = (0,) + tuple(10 ** (count - 1) for count in range(1, geometry.win_length + 1))
+        self.table = {}
+        self.nodes = 0
+        self.table_hits = 0
+
+    def evaluate(self, mine, theirs):
+        weights = self.weights
+        score = 0
+        for mask in self.geometry.win_masks:
+            own = mine & mask
+            other = theirs & mask
+            if not other:
+                score += weights[own.bit_count()]
+            elif not own:
+                score -= weights[other.bit_count()]
+        return score
+
+    def _gain(self, mine, theirs, cell):
+        # Change in evaluate() when the mover takes cell
+        weights = self.weights
+        gain = 0
+        for mask in self.geometry.masks_through[cell]:
+            own = mine & mask
+            other = theirs & mask
+            if not other:
+                count = own.bit_count()
+                gain += weights[count + 1] - weights[count]
+            elif not own:
+                gain += weights[other.bit_count()]
+        return gain
+
+    def _candidates(self, mine, theirs):
+        geometry = self.geometry
+        occupied = mine | theirs
+        if not occupied:
+            return [geometry.center_order[0]]
+        if geometry.cells <= 25:
+            return geometry.legal_moves(occupied)
+
+        near = 0
+        stones = occupied
+        while stones:
+            low = stones & -stones
+            near |= geometry.neighbourhood[low.bit_length() - 1]
+            stones ^= low
+        return geometry.legal_moves(occupied | (~near & geometry.full_mask))
+
+    def search(self, mine, theirs, deadline=None):
+        # Iterative deepening up to max_depth. deadline is a time.perf_counter()
+        # value; once it passes, the move from the last completed depth is
+        # returned. Depth 1 always completes so there is a move to play.
+        self.nodes = 0
+        self.table_hits = 0
+        self.deadline = None
+        evaluation = self.evaluate(mine, theirs)
+
+        result = SearchResult(None, 0, 0, 0, 0)
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move = self._negamax(mine, theirs, depth, 0, -WIN_SCORE - 1, WIN_SCORE + 1, evaluation)
+            except SearchTimeout:
+                break
+            result = SearchResult(move, score, self.nodes, self.table_hits, depth)
+            # A forced win or loss will not change with more depth
+            if abs(score) > WIN_SCORE // 2 or move is None:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self.deadline = deadline
+
+        # Nodes from an abandoned iteration still cost time, so count them
+        return result._replace(nodes=self.nodes, table_hits=self.table_hits)
+
+    def _negamax(self, mine, theirs, depth, ply, alpha, beta, evaluation):
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 15 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
+        geometry = self.geometry
+
+        key = (mine, theirs)
+        entry = self.table.get(key)
+        hint = None
+        if entry is not None:
+            entry_depth, flag, stored, hint = entry
+            if entry_depth >= depth:
+                self.table_hits += 1
+                score = _from_table_score(stored, ply)
+                if flag == EXACT:
+                    return score, hint
+                if flag == LOWER and score > alpha:
+                    alpha = score
+                elif flag == UPPER and score < beta:
+                    beta = score
+                if alpha >= beta:
+                    return score, hint
+
+        moves = self._candidates(mine, theirs)
+        if not moves:
+            return 0, None
+
+        ordered = sorted(((self._gain(mine, theirs, cell), cell) for cell in moves), reverse=True)
+        if hint is not None:
+            ordered.sort(key=lambda item: item[1] != hint)
+
+        original_alpha = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for gain, cell in ordered:
+            child = mine | (1 << cell)
+            if geometry.wins_at(child, cell):
+                score = WIN_SCORE - ply
+            elif child | theirs == geometry.full_mask:
+                score = 0
+            elif depth <= 1:
+                score = evaluation + gain
+            else:
+                score = -self._negamax(theirs, child, depth - 1, ply + 1, -beta, -alpha, -(evaluation + gain))[0]
+
+            if score > best_score:
+                best_score = score
+                best_move = cell
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, flag, _to_table_score(best_score, ply), best_move)
+        return best_score, best_move
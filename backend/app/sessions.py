@@ -0,0 +1,125 @@
+import time
+
+from fastapi import HTTPException
+
+from .game_logic import TicTacToeGame
+from .wire import loads
+
+# Longest move message accepted over a game socket; "{"cell": 224}" fits
+MAX_MESSAGE_LENGTH = 64
+
+
+def parse_move(text):
+    # A move is a bare cell number ("4"), {"cell": 4}, or null / {"cell":
+    # null} to ask the AI to move when it is its turn
+    if len(text) > MAX_MESSAGE_LENGTH:
+        raise HTTPException(status_code=400, detail="Message too long")
+    try:
+        message = loads(text)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Message must be a cell number or {\"cell\": n}")
+    if isinstance(message, dict):
+        message = message.get("cell")
+    if message is not None and (not isinstance(message, int) or isinstance(message, bool)):
+        raise HTTPException(status_code=400, detail="cell must be an integer")
+    return message
+
+
+def choose_ai_move(board, human_player, ai_player, difficulty, board_size, win_length, time_limit, seed=None):
+    # Runs in an engine pool worker; takes plain values so the arguments
+    # pickle cheaply
+    game = TicTacToeGame(board, human_player, ai_player, ai_player, difficulty, True, None,
+                         board_size, win_length, time_limit, seed=seed)
+    start = time.perf_counter()
+    move = game.get_ai_move()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    search = game.last_search
+    return move, {
+        "depth": search.depth if search else 0,
+        "nodes": search.nodes if search else 0,
+        "elapsed_ms": round(elapsed_ms, 3),
+        "table_hits": search.table_hits if search else 0,
+    }
+
+
+class GameSession:
+    # Server-side state of a game played over a WebSocket. Moves are applied
+    # to the TicTacToeGame in place; only the moves go over the socket.
+
+    __slots__ = ("board_size", "game", "game_id", "score_o", "score_x", "version", "win_length")
+
+    def __init__(self, game_id, data, time_limit):
+        self.game_id = game_id
+        self.board_size = data["board_size"]
+        self.win_length = data["win_length"]
+        self.score_x = data["score_x"]
+        self.score_o = data["score_o"]
+        # Version of the state last handed to the game cache
+        self.version = data["version"]
+        self.game = TicTacToeGame(
+            board=list(data["board"]),
+            human_player=data["human_player"],
+            ai_player=data["ai_player"],
+            current_player=data["current_player"],
+            difficulty=data["difficulty"],
+            game_active=data["game_active"],
+            winner=data["winner"],
+            board_size=self.board_size,
+            win_length=self.win_length,
+            time_limit=time_limit,
+            seed=data.get("seed")
+        )
+
+    def play(self, cell, player):
+        # Applies one move and returns its (ply, cell, player) record
+        game = self.game
+        ply = len(game.board) - game.board.count('') + 1
+        game.make_move(cell, player)
+        if game.check_win_at(cell, player):
+            game.game_active = False
+            game.winner = player
+            if player == 'X':
+                self.score_x += 1
+            else:
+                self.score_o += 1
+        elif game.is_board_full():
+            game.game_active = False
+            game.winner = "tie"
+        else:
+            game.current_player = game.ai_player if player == game.human_player else game.human_player
+        return ply, cell, player
+
+    def undo(self, move):
+        # Takes back a move that did not end the game
+        _, cell, player = move
+        self.game.board[cell] = ''
+        self.game.current_player = player
+
+    def search_args(self):
+        game = self.game
+        return (list(game.board), game.human_player, game.ai_player, game.difficulty,
+                self.board_size, self.win_length, game.time_limit, game.seed)
+
+    def status(self):
+        return {
+            "current_player": self.game.current_player,
+            "game_active": self.game.game_active,
+            "winner": self.game.winner,
+            "score_x": self.score_x,
+            "score_o": self.score_o,
+        }
+
+    def state(self):
+        game = self.game
+        return {
+            "id": self.game_id,
+            "board": list(game.board),
+            "board_size": self.board_size,
+            "win_length": self.win_length,
+            "human_player": game.human_player,
+            "ai_player": game.ai_player,
+            "difficulty": game.difficulty,
+            "seed": game.seed,
+            "version": self.version,
+            **self.status(),
+        }
@@ -0,0 +1,160 @@
+# Self-play tournaments between AI policies, run in-process across all cores:
+#
+#     python -m app.simulation easy normal hard --games 100000 --seed 1
+#     python -m app.simulation hard mybots.greedy:choose --board-size 7 --win-length 5
+#
+# A policy is a difficulty (easy, normal, hard), "random", or a
+# "module:function" taking a TicTacToeGame whose ai_player is the side to
+# move and returning a cell. Every pair of policies a and b (including each
+# policy against itself) plays --games games,
+# swapping who moves first each game. Games are split into chunks seeded from
+# --seed and the chunk number, so results do not depend on the number of
+# workers. Running totals are printed as chunks finish.
+
+import argparse
+import importlib
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from .game_logic import DIFFICULTIES, TicTacToeGame
+from .solver import get_solved_table
+
+CHUNK_SIZE = 1000
+
+
+def random_policy(game):
+    return game.rng.choice([i for i, cell in enumerate(game.board) if cell == ''])
+
+
+def resolve_policy(spec):
+    # Returns (difficulty, move function) for a policy name
+    if spec in DIFFICULTIES:
+        return spec, TicTacToeGame.get_ai_move
+    if spec == 'random':
+        return 'random', random_policy
+    module, _, function = spec.partition(':')
+    if not function:
+        raise ValueError(f"unknown policy {spec!r}: use easy, normal, hard, random or module:function")
+    return 'custom', getattr(importlib.import_module(module), function)
+
+
+def play_game(first, second, board_size, win_length, time_limit, rng):
+    # Plays one game, first moving as X; returns 'first', 'second' or 'tie'
+    # and the number of plies. Both sides share one board list.
+    board = [''] * (board_size * board_size)
+    sides = []
+    for (difficulty, choose), me, other in ((first, 'X', 'O'), (second, 'O', 'X')):
+        game = TicTacToeGame(board, other, me, me, difficulty, True, None, board_size, win_length, time_limit, rng)
+        sides.append((game, choose))
+
+    for ply in range(len(board)):
+        game, choose = sides[ply % 2]
+        cell = choose(game)
+        board[cell] = game.ai_player
+        if game.check_win_at(cell, game.ai_player):
+            return ('first', 'second')[ply % 2], ply + 1
+    return 'tie', len(board)
+
+
+def play_chunk(task):
+    # Runs in a worker: games between policies a and b, alternating who starts
+    pair, a_spec, b_spec, start, count, board_size, win_length, time_limit, seed = task
+    rng = random.Random(seed)
+    a, b = resolve_policy(a_spec), resolve_policy(b_spec)
+    result = {"pair": pair, "games": count, "a_wins": 0, "b_wins": 0, "ties": 0, "plies": 0}
+    for index in range(start, start + count):
+        swapped = index % 2 == 1
+        outcome, plies = play_game(b if swapped else a, a if swapped else b, board_size, win_length, time_limit, rng)
+        if outcome == 'tie':
+            result["ties"] += 1
+        elif (outcome == 'first') != swapped:
+            result["a_wins"] += 1
+        else:
+            result["b_wins"] += 1
+        result["plies"] += plies
+    return result
+
+
+def _tasks(policies, games, board_size, win_length, time_limit, seed):
+    pairs = list(itertools.combinations_with_replacement(policies, 2))
+    for pair, (a, b) in enumerate(pairs):
+        for chunk, start in enumerate(range(0, games, CHUNK_SIZE)):
+            # Seeded per chunk, so the same games are played with any worker count
+            yield (pair, a, b, start, min(CHUNK_SIZE, games - start),
+                   board_size, win_length, time_limit, f"{seed}:{pair}:{chunk}")
+
+
+def run(policies, games, board_size=3, win_length=3, time_limit=0.01, seed=0, workers=None, on_progress=None):
+    # Plays the tournament and returns one result per pair of policies
+    for spec in policies:
+        resolve_policy(spec)
+    pairs = list(itertools.combinations_with_replacement(policies, 2))
+    totals = [
+        {"a": a, "b": b, "games": 0, "a_wins": 0, "b_wins": 0, "ties": 0, "plies": 0}
+        for a, b in pairs
+    ]
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=get_solved_table) as pool:
+        tasks = _tasks(policies, games, board_size, win_length, time_limit, seed)
+        for result in pool.imap_unordered(play_chunk, tasks):
+            total = totals[result["pair"]]
+            for key in ("games", "a_wins", "b_wins", "ties", "plies"):
+                total[key] += result[key]
+            if on_progress is not None:
+                on_progress(total, time.perf_counter() - start)
+    return totals, time.perf_counter() - start
+
+
+def _line(total):
+    games = total["games"] or 1
+    return (f"{total['a']:>10} vs {total['b']:<10}{total['games']:>10} games  "
+            f"{total['a_wins'] / games:6.1%} / {total['ties'] / games:6.1%} / {total['b_wins'] / games:6.1%}")
+
+
+class _Progress:
+    # Prints running totals to stderr at most once a second
+
+    def __init__(self):
+        self.printed_at = 0.0
+
+    def __call__(self, total, elapsed):
+        if elapsed - self.printed_at >= 1:
+            self.printed_at = elapsed
+            print(f"[{elapsed:6.1f} s] {_line(total)}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.simulation")
+    parser.add_argument("policies", nargs="+", help="easy, normal, hard, random or module:function")
+    parser.add_argument("--games", type=int, default=10000, help="games per pair of policies")
+    parser.add_argument("--board-size", type=int, default=3)
+    parser.add_argument("--win-length", type=int, default=3)
+    parser.add_argument("--time-limit", type=float, default=0.01,
+                        help="seconds per hard move on boards other than 3x3")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="processes; defaults to one per core")
+    parser.add_argument("--json", action="store_true", help="print the final results as JSON")
+    args = parser.parse_args(argv)
+
+    print("a wins / ties / b wins; each pair alternates who starts", file=sys.stderr)
+    totals, elapsed = run(
+        args.policies, args.games, args.board_size, args.win_length, args.time_limit, args.seed, args.workers,
+        on_progress=_Progress()
+    )
+    played = sum(total["games"] for total in totals)
+    workers = args.workers or multiprocessing.cpu_count()
+    print(f"\n{played} games in {elapsed:.1f} s: {played / elapsed:.0f} games/s, "
+          f"{played / elapsed / workers:.0f} games/s per worker", file=sys.stderr)
+    if args.json:
+        print(json.dumps(totals, indent=2))
+    else:
+        for total in totals:
+            print(_line(total))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from .bitboard import FULL_MASK, LEGAL_MOVES, WINNING, encode
+
+_solved_table = None
+
+
+def _shrink(score):
+    # A result one ply further away is worth one point less, exactly like the
+    # depth penalty applied by TicTacToeGame._minimax.
+    if score > 0:
+        return score - 1
+    if score < 0:
+        return score + 1
+    return 0
+
+
+def _solve(mine, theirs, table):
+    # Positions are stored relative to the side to move, so X-to-move and
+    # O-to-move share one entry.
+    key = (mine, theirs)
+    entry = table.get(key)
+    if entry is not None:
+        return entry[1]
+
+    best_score = -11
+    best_move = None
+    occupied = mine | theirs
+    for i in LEGAL_MOVES[occupied]:
+        child = mine | (1 << i)
+        if WINNING[child]:
+            score = 10
+        elif child | theirs == FULL_MASK:
+            score = 0
+        else:
+            score = -_shrink(_solve(theirs, child, table))
+
+        # Strict comparison keeps the lowest index among equal moves, which is
+        # the same tie-break as TicTacToeGame._minimax_move.
+        if score > best_score:
+            best_score = score
+            best_move = i
+
+    table[key] = (best_move, best_score)
+    return best_score
+
+
+def build_solved_table():
+    # Maps (mover bits, opponent bits) -> (best move, score) for every
+    # position reachable from an empty board.
+    table = {}
+    _solve(0, 0, table)
+    return table
+
+
+def get_solved_table():
+    global _solved_table
+    if _solved_table is None:
+        _solved_table = build_solved_table()
+    return _solved_table
+
+
+def lookup_best_move(board, player, opponent):
+    # Returns (move, score) or None when the position is not in the table
+    # (finished games, boards that cannot arise in legal play, ...).
+    return get_solved_table().get((encode(board, player), encode(board, opponent)))
@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+
+from .metrics import STARTUP_PHASE_SECONDS
+
+
+class Startup:
+    # Startup phases of this process and how long each took. The process is
+    # ready once the background warm-up has finished; until then /readyz
+    # answers 503 and load balancers keep traffic away.
+
+    def __init__(self):
+        self.phases = {}  # name -> {"status", "seconds"[, "error"]}
+        self.ready = False
+
+    def record(self, name, seconds, status="done"):
+        self.phases[name] = {"status": status, "seconds": round(seconds, 4)}
+        STARTUP_PHASE_SECONDS.labels(name).set(seconds)
+        print(f"Startup phase {name}: {status} in {seconds * 1000:.0f} ms")
+
+    @contextmanager
+    def phase(self, name):
+        self.phases[name] = {"status": "running", "seconds": None}
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record(name, time.perf_counter() - start, "failed")
+            self.phases[name]["error"] = str(e)
+            raise
+        self.record(name, time.perf_counter() - start)
+
+    def state(self):
+        return {"ready": self.ready, "phases": self.phases}
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+
+# Seconds stats responses may be served from memory
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "5"))
+
+
+class StatsCache:
+    # Holds the game_stats rows for ttl seconds; concurrent misses share one
+    # query
+
+    def __init__(self, fetch, ttl=STATS_CACHE_TTL):
+        # fetch is an async callable returning the game_stats rows
+        self.fetch = fetch
+        self.ttl = ttl
+        self._rows = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def rows(self):
+        if self._rows is not None and time.monotonic() < self._expires_at:
+            return self._rows
+        async with self._lock:
+            if self._rows is None or time.monotonic() >= self._expires_at:
+                self._rows = await self.fetch()
+                self._expires_at = time.monotonic() + self.ttl
+        return self._rows
+
+    def clear(self):
+        self._rows = None
+
+
+def _record():
+    return {"games": 0, "human_wins": 0, "ai_wins": 0, "ties": 0}
+
+
+def _add(record, outcome, games):
+    record["games"] += games
+    if outcome == "human":
+        record["human_wins"] += games
+    elif outcome == "ai":
+        record["ai_wins"] += games
+    else:
+        record["ties"] += games
+
+
+def _with_rate(record):
+    return {**record, "human_win_rate": record["human_wins"] / record["games"] if record["games"] else 0.0}
+
+
+def summarize(rows):
+    # Outcomes from the human's side: overall, per difficulty and per board
+    total = _record()
+    by_difficulty = {}
+    by_board = {}
+    for row in rows:
+        board = f"{row['board_size']}x{row['board_size']}/{row['win_length']}"
+        for record in (total, by_difficulty.setdefault(row["difficulty"], _record()),
+                       by_board.setdefault(board, _record())):
+            _add(record, row["outcome"], row["games"])
+    return {
+        "total": _with_rate(total),
+        "by_difficulty": {key: _with_rate(record) for key, record in sorted(by_difficulty.items())},
+        "by_board": {key: _with_rate(record) for key, record in sorted(by_board.items())},
+    }
+
+
+def leaderboard(rows):
+    # Totals per player symbol over both roles, most wins first. There are
+    # no accounts, so a player is the symbol a side played as.
+    players = {}
+    for row in rows:
+        human = players.setdefault(row["human_player"], {"games": 0, "wins": 0, "losses": 0, "ties": 0})
+        ai = players.setdefault(row["ai_player"], {"games": 0, "wins": 0, "losses": 0, "ties": 0})
+        games = row["games"]
+        human["games"] += games
+        ai["games"] += games
+        if row["outcome"] == "tie":
+            human["ties"] += games
+            ai["ties"] += games
+        else:
+            winner, loser = (human, ai) if row["outcome"] == "human" else (ai, human)
+            winner["wins"] += games
+            loser["losses"] += games
+    entries = [
+        {"player": player, **record, "win_rate": record["wins"] / record["games"] if record["games"] else 0.0}
+        for player, record in players.items()
+    ]
+    return sorted(entries, key=lambda entry: (-entry["wins"], entry["player"]))
@@ -0,0 +1,59 @@
+import json
+from typing import Annotated
+
+from pydantic import BeforeValidator
+from starlette.responses import Response
+
+from .database import _board_from_text, _board_to_text
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Opt-in wire format: the same JSON objects with the board as one character
+# per cell, '.' for empty ("X...O...."), instead of a list of strings.
+# Clients send it as the request Content-Type and ask for it with Accept.
+COMPACT_MEDIA_TYPE = "application/vnd.tictactoe.compact+json"
+
+
+def _parse_board(board):
+    return _board_from_text(board) if isinstance(board, str) else board
+
+
+# A board in either format; always a list of cells once validated
+Board = Annotated[list[str], BeforeValidator(_parse_board)]
+
+
+def dumps(value):
+    # JSON bytes; orjson when it is installed
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def wants_compact(request):
+    return COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+class CompactResponse(Response):
+    # Renders a game dict, or a model holding one, with a text board
+    media_type = COMPACT_MEDIA_TYPE
+
+    def render(self, content):
+        data = content if isinstance(content, dict) else content.model_dump()
+        return dumps({**data, "board": _board_to_text(data["board"])})
+
+
+def respond(request, content):
+    # content as is for the endpoint's response model, or compact when the
+    # client asked for it
+    if wants_compact(request):
+        return CompactResponse(content)
+    return content
@@ -0,0 +1,53 @@
+# Measures request throughput of the game CRUD endpoints against a running
+# backend, for comparing the sync psycopg2 and async asyncpg paths:
+#
+#     uvicorn app.main:app --workers 1 &
+#     python -m benchmarks.endpoint_throughput --url http://localhost:8000 --concurrency 64
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+NEW_GAME = {
+    "board": ['', '', '', '', '', '', '', '', ''],
+    "human_player": "X",
+    "ai_player": "O",
+    "current_player": "X",
+    "difficulty": "normal",
+    "game_active": True,
+}
+
+
+async def _player(client, deadline, counts):
+    while time.perf_counter() < deadline:
+        game = (await client.post("/games", json=NEW_GAME)).json()
+        game["board"][4] = "X"
+        await client.put(f"/games/{game['id']}", json=game)
+        await client.get(f"/games/{game['id']}")
+        counts[0] += 3
+
+
+async def run(url, concurrency, seconds):
+    counts = [0]
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + seconds
+        start = time.perf_counter()
+        await asyncio.gather(*(_player(client, deadline, counts) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    print(f"{counts[0]} requests in {elapsed:.1f} s: {counts[0] / elapsed:.0f} req/s at concurrency {concurrency}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# Engine benchmark suite. Times move generation per difficulty and the
+# search and win-detection primitives over a fixed corpus of positions,
+# and optionally compares against a saved baseline:
+#
+#     python -m benchmarks.engine --save baseline.json
+#     python -m benchmarks.engine --compare baseline.json --threshold 0.25
+#
+# The exit status is 1 when any benchmark is slower than the baseline by
+# more than the threshold.
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from app.bitboard import encode, get_geometry
+from app.game_logic import TicTacToeGame
+from app.search import AlphaBetaSearch, HeuristicSearch
+
+CORPUS = {
+    "empty": ['', '', '', '', '', '', '', '', ''],
+    "mid-game": ['X', '', '', '', 'O', '', '', '', 'X'],
+    "near-terminal": ['X', 'O', 'X', 'X', 'O', '', '', '', ''],
+}
+
+LARGE_CORPUS = {
+    "7x7-opening": (7, 5, {24: 'X', 25: 'O', 17: 'X'}),
+    "15x15-mid-game": (15, 5, {112: 'X', 113: 'O', 97: 'X', 128: 'O', 98: 'X', 82: 'O'}),
+}
+
+
+def _game(board, difficulty='hard', board_size=3, win_length=3):
+    return TicTacToeGame(list(board), 'X', 'O', 'O', difficulty, True, None, board_size, win_length)
+
+
+def _large_board(size, stones):
+    board = [''] * (size * size)
+    for cell, player in stones.items():
+        board[cell] = player
+    return board
+
+
+class CountingGame(TicTacToeGame):
+    nodes = 0
+
+    def _minimax(self, board, depth, is_maximizing):
+        self.nodes += 1
+        return super()._minimax(board, depth, is_maximizing)
+
+
+def _time(fn, min_time):
+    # Best of three rounds, each running fn until min_time has passed
+    best = float('inf')
+    for _ in range(3):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / calls)
+    return best
+
+
+def _peak_memory(fn):
+    # High-water mark of memory allocated during one call, from tracemalloc
+    fn()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return max(0, peak - before)
+
+
+def _cases():
+    # name -> (callable, callable returning nodes per call or None)
+    cases = {}
+    for position, board in CORPUS.items():
+        for difficulty in ('easy', 'normal', 'hard'):
+            game = _game(board, difficulty)
+            cases[f"move/{difficulty}/{position}"] = (game.get_ai_move, None)
+
+        game = _game(board)
+        mine, theirs = encode(board, 'O'), encode(board, 'X')
+        cases[f"smart/{position}"] = (lambda game=game: game._get_smart_move(
+            [i for i, cell in enumerate(game.board) if cell == '']), None)
+        cases[f"check_win/{position}"] = (lambda game=game: game.check_win('X'), None)
+        cases[f"alphabeta/{position}"] = (
+            lambda mine=mine, theirs=theirs: AlphaBetaSearch().search(mine, theirs),
+            lambda mine=mine, theirs=theirs: AlphaBetaSearch().search(mine, theirs).nodes
+        )
+        if position != "empty":
+            # The reference minimax takes seconds on an empty board
+            cases[f"minimax/{position}"] = (game._minimax_move, lambda board=board: _minimax_nodes(board))
+
+    for position, (size, win_length, stones) in LARGE_CORPUS.items():
+        board = _large_board(size, stones)
+        geometry = get_geometry(size, win_length)
+        mine, theirs = encode(board, 'O'), encode(board, 'X')
+        cases[f"heuristic/{position}"] = (
+            lambda geometry=geometry, mine=mine, theirs=theirs: HeuristicSearch(geometry, 2).search(mine, theirs),
+            lambda geometry=geometry, mine=mine, theirs=theirs: HeuristicSearch(geometry, 2).search(mine, theirs).nodes
+        )
+        game = _game(board, 'hard', size, win_length)
+        cases[f"check_win/{position}"] = (lambda game=game: game.check_win('X'), None)
+    return cases
+
+
+def _minimax_nodes(board):
+    game = CountingGame(list(board), 'X', 'O', 'O', 'hard', True, None)
+    game._minimax_move()
+    return game.nodes
+
+
+def run(min_time, pattern=None):
+    random.seed(0)
+    results = {}
+    for name, (fn, count_nodes) in _cases().items():
+        if pattern and pattern not in name:
+            continue
+        seconds = _time(fn, min_time)
+        result = {
+            "us_per_op": round(seconds * 1e6, 3),
+            "peak_alloc_bytes": _peak_memory(fn),
+        }
+        if count_nodes is not None:
+            nodes = count_nodes()
+            result["nodes"] = nodes
+            result["nodes_per_sec"] = round(nodes / seconds)
+        results[name] = result
+        print(f"{name:<36}{result['us_per_op']:>14.2f} us{result['peak_alloc_bytes']:>10} B"
+              + (f"{result['nodes_per_sec']:>14} nodes/s" if count_nodes else ""))
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = result["us_per_op"] / previous["us_per_op"] if previous["us_per_op"] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append((name, previous["us_per_op"], result["us_per_op"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.engine")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per timing round")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    results = run(args.min_time, args.filter)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "benchmarks": results,
+            }, f, indent=2)
+        print(f"\nsaved {len(results)} results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["benchmarks"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for name, before, after, ratio in regressions:
+                print(f"  {name}: {before:.2f} us -> {after:.2f} us ({ratio:.2f}x)")
+            return 1
+        print(f"\nno regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
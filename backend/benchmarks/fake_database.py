@@ -0,0 +1,152 @@
+# In-memory stand-in for app.database, so the API can be driven without a
+# Postgres server. It keeps the same function signatures and the same
+# semantics that matter under load: ids are assigned on insert, writes are
+# refused once the row has moved on from the version they were based on,
+# and every call can be given a simulated round-trip latency.
+
+import asyncio
+import copy
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from app.database import TURN_COLUMNS
+
+# Names in app.main that refer to the database layer
+FUNCTIONS = (
+    "init_pool", "close_pool", "migrate", "ping_database", "insert_game", "fetch_game", "fetch_archived_game",
+    "save_games", "transaction", "write_turn", "write_moves",
+    "fetch_moves", "fetch_stats", "archive_finished_games",
+)
+
+
+class FakeDatabase:
+
+    def __init__(self, latency=0.0, max_connections=10):
+        # latency is seconds per round trip
+        self.latency = latency
+        self.games = {}
+        self.archived = {}
+        self.moves = {}  # game_id -> {ply: move}
+        self.queries = 0
+        self._next_id = 1
+        self._connections = None
+        self._max_connections = max_connections
+
+    async def _round_trip(self):
+        self.queries += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @asynccontextmanager
+    async def _connection(self):
+        if self._connections is None:
+            self._connections = asyncio.Semaphore(self._max_connections)
+        try:
+            await asyncio.wait_for(self._connections.acquire(), 5)
+        except TimeoutError:
+            raise HTTPException(status_code=503, detail="Database busy: no free connection")
+        try:
+            yield object()
+        finally:
+            self._connections.release()
+
+    async def init_pool(self):
+        return None
+
+    async def close_pool(self):
+        pass
+
+    async def migrate(self):
+        pass
+
+    async def ping_database(self):
+        async with self._connection():
+            await self._round_trip()
+
+    async def insert_game(self, game):
+        async with self._connection():
+            await self._round_trip()
+            game_id = self._next_id
+            self._next_id += 1
+            self.games[game_id] = {**copy.deepcopy(game), "id": game_id, "version": 0}
+            return game_id
+
+    async def fetch_game(self, game_id):
+        async with self._connection():
+            await self._round_trip()
+            game = self.games.get(game_id)
+            return copy.deepcopy(game) if game else None
+
+    async def fetch_archived_game(self, game_id):
+        async with self._connection():
+            await self._round_trip()
+            game = self.archived.get(game_id)
+            return copy.deepcopy(game) if game else None
+
+    @asynccontextmanager
+    async def transaction(self, operation="other"):
+        async with self._connection() as conn:
+            yield conn
+
+    async def write_turn(self, conn, game_id, game, base_version):
+        await self._round_trip()
+        if game_id not in self.games or self.games[game_id]["version"] != base_version:
+            return False
+        self._update(game_id, game)
+        return True
+
+    async def write_moves(self, conn, moves):
+        await self._round_trip()
+        for game_id, ply, cell, player in moves:
+            self.moves.setdefault(game_id, {}).setdefault(ply, {"ply": ply, "cell": cell, "player": player})
+
+    async def fetch_moves(self, game_id):
+        async with self._connection():
+            await self._round_trip()
+            return [dict(move) for _, move in sorted(self.moves.get(game_id, {}).items())]
+
+    async def save_games(self, games, moves=()):
+        # One round trip for the games and one for their moves, like the
+        # batch UPDATE; games whose row moved on from base_version are skipped
+        async with self._connection() as conn:
+            await self._round_trip()
+            skipped = []
+            for game_id, game, base_version in games:
+                if game_id in self.games and self.games[game_id]["version"] != base_version:
+                    skipped.append(game_id)
+                else:
+                    self._update(game_id, game)
+            await self.write_moves(conn, [move for move in moves if move[0] not in skipped])
+            return skipped
+
+    async def fetch_stats(self):
+        # Counted on each call; the real table is kept up to date by a trigger
+        counts = {}
+        for game in self.games.values():
+            if game["game_active"] or game["winner"] is None:
+                continue
+            outcome = "tie" if game["winner"] == "tie" else "human" if game["winner"] == game["human_player"] else "ai"
+            key = (game["difficulty"], game["board_size"], game["win_length"],
+                   game["human_player"], game["ai_player"], outcome)
+            counts[key] = counts.get(key, 0) + 1
+        await self._round_trip()
+        columns = ("difficulty", "board_size", "win_length", "human_player", "ai_player", "outcome")
+        return [{**dict(zip(columns, key)), "games": games} for key, games in counts.items()]
+
+    async def archive_finished_games(self, older_than, limit):
+        # Finished games are kept; tests archive a game by moving it from
+        # games to archived themselves
+        return 0
+
+    def _update(self, game_id, game):
+        # Like the UPDATE, only the turn columns and the version are written
+        if game_id in self.games:
+            self.games[game_id].update(copy.deepcopy({column: game[column] for column in (*TURN_COLUMNS, "version")}))
+
+    def install(self, module):
+        # Points module's database functions, and its game cache writer, at
+        # this fake
+        for name in FUNCTIONS:
+            setattr(module, name, getattr(self, name))
+        module.game_cache.writer = self.save_games
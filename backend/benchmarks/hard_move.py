@@ -0,0 +1,52 @@
+# Compares hard-mode move latency of the solved table against the full
+# minimax recursion.
+#
+#     python -m benchmarks.hard_move
+
+import time
+
+from app.game_logic import TicTacToeGame
+from app.solver import get_solved_table
+
+POSITIONS = {
+    "empty": ['', '', '', '', '', '', '', '', ''],
+    "opening": ['X', '', '', '', '', '', '', '', ''],
+    "mid-game": ['X', '', '', '', 'O', '', '', '', 'X'],
+    "near-terminal": ['X', 'O', 'X', 'X', 'O', '', '', '', ''],
+}
+
+
+def _game(board):
+    return TicTacToeGame(
+        board=list(board),
+        human_player='X',
+        ai_player='O',
+        current_player='O',
+        difficulty='hard',
+        game_active=True,
+        winner=None
+    )
+
+
+def _time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    start = time.perf_counter()
+    get_solved_table()
+    print(f"table build: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'position':<15}{'minimax':>15}{'table':>15}{'speedup':>12}")
+    for name, board in POSITIONS.items():
+        game = _game(board)
+        recursion = _time_per_call(game._minimax_move, 1 if board.count('') > 7 else 20)
+        lookup = _time_per_call(game._get_hard_move, 10000)
+        print(f"{name:<15}{recursion * 1e6:>12.0f} us{lookup * 1e6:>12.2f} us{recursion / lookup:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
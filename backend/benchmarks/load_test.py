@@ -0,0 +1,169 @@
+# Load test that plays whole games against the API. Each virtual player
+# creates a game, alternates POST /ai-move and PUT /games/{id} until the
+# game ends, reads it back with GET, and starts the next one. Reports
+# throughput and latency percentiles per endpoint.
+#
+# Against a running server:
+#
+#     python -m benchmarks.load_test --url http://localhost:8000 --players 50
+#
+# In-process, with no server and no Postgres (the default):
+#
+#     python -m benchmarks.load_test --players 50 --ramp-up 5 --mix easy=1,normal=2,hard=1
+#
+# --database postgres runs in-process against the database in DB_* instead
+# of the in-memory fake.
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from .fake_database import FakeDatabase
+
+ENDPOINTS = ("POST /games", "POST /ai-move", "PUT /games/{id}", "GET /games/{id}")
+
+
+def parse_mix(text):
+    # "easy=1,hard=3" -> [("easy", 1.0), ("hard", 3.0)]
+    mix = []
+    for part in text.split(","):
+        difficulty, _, weight = part.partition("=")
+        mix.append((difficulty.strip(), float(weight or 1)))
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Stats:
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.games = 0
+
+    async def request(self, client, endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return None
+        return response.json()
+
+    def report(self, elapsed):
+        print(f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'req/s':>10}"
+              f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for endpoint in ENDPOINTS:
+            values = sorted(self.latencies[endpoint])
+            print(f"{endpoint:<18}{len(values):>10}{self.errors[endpoint]:>8}{len(values) / elapsed:>10.1f}"
+                  + "".join(f"{percentile(values, p) * 1000:>10.2f}" for p in (0.5, 0.9, 0.99, 1.0)))
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"\n{total} requests, {self.games} games in {elapsed:.1f} s: "
+              f"{total / elapsed:.0f} req/s, {self.games / elapsed:.1f} games/s")
+
+
+async def play_game(client, stats, rng, difficulty):
+    game = await stats.request(client, "POST /games", "POST", "/games", json={
+        "board": [''] * 9,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "X",
+        "difficulty": difficulty,
+        "game_active": True,
+    })
+    if game is None:
+        return
+    game_id = game["id"]
+    while game["game_active"]:
+        empty = [i for i, cell in enumerate(game["board"]) if cell == '']
+        game["board"][rng.choice(empty)] = game["human_player"]
+        game["current_player"] = game["ai_player"]
+        result = await stats.request(client, "POST /ai-move", "POST", "/ai-move", json=game)
+        if result is None:
+            return
+        result.pop("search", None)
+        game = await stats.request(client, "PUT /games/{id}", "PUT", f"/games/{game_id}", json=result)
+        if game is None:
+            return
+    await stats.request(client, "GET /games/{id}", "GET", f"/games/{game_id}")
+    stats.games += 1
+
+
+async def player(client, stats, rng, mix, start_at, stop_at):
+    await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+    difficulties, weights = zip(*mix)
+    while time.perf_counter() < stop_at:
+        await play_game(client, stats, rng, rng.choices(difficulties, weights)[0])
+
+
+async def run(client, players=10, seconds=10.0, ramp_up=0.0, mix=(("normal", 1.0),), seed=0):
+    # Player i starts i * ramp_up / players seconds in; all stop together
+    stats = Stats()
+    start = time.perf_counter()
+    stop_at = start + ramp_up + seconds
+    await asyncio.gather(*(
+        player(client, stats, random.Random(seed + i), mix, start + i * ramp_up / players, stop_at)
+        for i in range(players)
+    ))
+    return stats, time.perf_counter() - start
+
+
+async def run_in_process(database="fake", latency=0.0, **options):
+    from app import main
+
+    if database == "fake":
+        FakeDatabase(latency=latency).install(main)
+    await main.startup_event()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=30) as client:
+            return await run(client, **options)
+    finally:
+        await main.shutdown_event()
+
+
+async def run_remote(url, players, **options):
+    limits = httpx.Limits(max_connections=players)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        return await run(client, players=players, **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test")
+    parser.add_argument("--url", help="server to load; runs the app in-process when left out")
+    parser.add_argument("--database", choices=("fake", "postgres"), default="fake",
+                        help="database for the in-process app")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="simulated round trip per fake database call")
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=10, help="time at full load")
+    parser.add_argument("--ramp-up", type=float, default=0, help="seconds until every player has started")
+    parser.add_argument("--mix", default="easy=1,normal=1,hard=1", help="difficulty weights")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    options = {"players": args.players, "seconds": args.seconds, "ramp_up": args.ramp_up,
+               "mix": parse_mix(args.mix), "seed": args.seed}
+    if args.url:
+        stats, elapsed = asyncio.run(run_remote(args.url, **options))
+    else:
+        stats, elapsed = asyncio.run(run_in_process(args.database, args.latency_ms / 1000, **options))
+    stats.report(elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Compares the original games layout (JSONB board, primary key only) with
+# the migrated one (text board, partial indexes on game_active):
+#
+#     python -m benchmarks.schema --codec-only
+#     python -m benchmarks.schema --rows 200000
+#
+# The codec comparison runs anywhere. The table comparison needs the
+# database in DB_* and creates and drops its own scratch tables.
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import asyncpg
+
+from app import database
+
+OLD_TABLE = """
+    CREATE TABLE bench_games_jsonb (
+        id SERIAL PRIMARY KEY,
+        board JSONB NOT NULL,
+        human_player VARCHAR(1) NOT NULL,
+        ai_player VARCHAR(1) NOT NULL,
+        current_player VARCHAR(1) NOT NULL,
+        difficulty VARCHAR(10) NOT NULL,
+        game_active BOOLEAN NOT NULL,
+        winner VARCHAR(3),
+        score_x INTEGER DEFAULT 0,
+        score_o INTEGER DEFAULT 0,
+        board_size INTEGER NOT NULL DEFAULT 3,
+        win_length INTEGER NOT NULL DEFAULT 3,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+NEW_TABLE = """
+    CREATE TABLE bench_games_text (
+        id SERIAL PRIMARY KEY,
+        human_player VARCHAR(1) NOT NULL,
+        ai_player VARCHAR(1) NOT NULL,
+        current_player VARCHAR(1) NOT NULL,
+        difficulty VARCHAR(10) NOT NULL,
+        game_active BOOLEAN NOT NULL,
+        winner VARCHAR(3),
+        score_x INTEGER DEFAULT 0,
+        score_o INTEGER DEFAULT 0,
+        board_size INTEGER NOT NULL DEFAULT 3,
+        win_length INTEGER NOT NULL DEFAULT 3,
+        board TEXT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE INDEX bench_games_text_active_idx ON bench_games_text (updated_at) WHERE game_active;
+"""
+COLUMNS = "board, human_player, ai_player, current_player, difficulty, game_active, winner, updated_at"
+
+
+def _per_call(fn, calls=20000):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def codec():
+    for size in (3, 15):
+        rng = random.Random(0)
+        board = [rng.choice(('', '', 'X', 'O')) for _ in range(size * size)]
+        as_json, as_text = json.dumps(board), database._board_to_text(board)
+        print(f"{size}x{size} board: JSON {len(as_json)} B, text {len(as_text)} B")
+        print(f"  encode  json {_per_call(lambda board=board: json.dumps(board)):6.2f} us"
+              f"   text {_per_call(lambda board=board: database._board_to_text(board)):6.2f} us")
+        print(f"  decode  json {_per_call(lambda text=as_json: json.loads(text)):6.2f} us"
+              f"   text {_per_call(lambda text=as_text: database._board_from_text(text)):6.2f} us")
+
+
+def _rows(count, board_encoder):
+    rng = random.Random(0)
+    for _ in range(count):
+        board = [rng.choice(('', 'X', 'O')) for _ in range(9)]
+        # Most games in a long-lived table are finished
+        active = rng.random() < 0.05
+        yield (board_encoder(board), 'X', 'O', 'X', rng.choice(('easy', 'normal', 'hard')), active,
+               None if active else rng.choice(('X', 'O', 'tie')),
+               # Seconds since the last move, spread over a month
+               rng.randrange(86400 * 30))
+
+
+async def _timed_query(conn, query, *args, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await conn.fetch(query, *args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def tables(rows):
+    conn = await asyncpg.connect(host=database.DB_HOST, port=database.DB_PORT, user=database.DB_USER,
+                                 password=database.DB_PASSWORD, database=database.DB_NAME)
+    try:
+        for table, ddl, encoder in (
+            ("bench_games_jsonb", OLD_TABLE, json.dumps),
+            ("bench_games_text", NEW_TABLE, database._board_to_text),
+        ):
+            await conn.execute(f"DROP TABLE IF EXISTS {table}")
+            await conn.execute(ddl)
+            await conn.executemany(
+                f"INSERT INTO {table} ({COLUMNS}) VALUES ($1, $2, $3, $4, $5, $6, $7, now() - make_interval(secs => $8))",
+                list(_rows(rows, encoder))
+            )
+            await conn.execute(f"ANALYZE {table}")
+            row_bytes = await conn.fetchval(f"SELECT avg(pg_column_size(t.*)) FROM {table} t")
+            total = await conn.fetchval(f"SELECT pg_total_relation_size('{table}')")
+            ids = random.Random(1).sample(range(1, rows + 1), 200)
+            by_id = await _timed_query(conn, f"SELECT * FROM {table} WHERE id = ANY($1)", ids, repeat=50)
+            active = await _timed_query(
+                conn, f"SELECT id FROM {table} WHERE game_active ORDER BY updated_at DESC LIMIT 50", repeat=50
+            )
+            print(f"{table}: {row_bytes:.0f} B/row, {total / 1e6:.1f} MB with indexes, "
+                  f"200 rows by id {by_id:.2f} ms, 50 newest active {active:.2f} ms")
+            await conn.execute(f"DROP TABLE {table}")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.schema")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--codec-only", action="store_true", help="skip the database comparison")
+    args = parser.parse_args()
+    codec()
+    if not args.codec_only:
+        asyncio.run(tables(args.rows))
+
+
+if __name__ == "__main__":
+    main()
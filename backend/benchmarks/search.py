@@ -0,0 +1,40 @@
+# Compares node counts and time of TicTacToeGame._minimax against the
+# alpha-beta search with a symmetry-aware transposition table.
+#
+#     python -m benchmarks.search
+
+import time
+
+from app.bitboard import encode
+from app.game_logic import TicTacToeGame
+from app.search import AlphaBetaSearch
+from benchmarks.hard_move import POSITIONS
+
+
+class CountingGame(TicTacToeGame):
+    nodes = 0
+
+    def _minimax(self, board, depth, is_maximizing):
+        self.nodes += 1
+        return super()._minimax(board, depth, is_maximizing)
+
+
+def main():
+    print(f"{'position':<15}{'minimax nodes':>15}{'ab nodes':>10}{'minimax':>14}{'alpha-beta':>14}")
+    for name, board in POSITIONS.items():
+        game = CountingGame(list(board), 'X', 'O', 'O', 'hard', True, None)
+        start = time.perf_counter()
+        game._minimax_move()
+        minimax_time = time.perf_counter() - start
+
+        # A fresh table each time, so nothing is reused from earlier positions
+        start = time.perf_counter()
+        result = AlphaBetaSearch().search(encode(board, 'O'), encode(board, 'X'))
+        search_time = time.perf_counter() - start
+
+        print(f"{name:<15}{game.nodes:>15}{result.nodes:>10}"
+              f"{minimax_time * 1000:>11.2f} ms{search_time * 1000:>11.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Per-request CPU time and payload size of the game endpoints in the JSON
+# and compact wire formats, with the app driven in-process over ASGI and
+# the fake database, so only the app's own work is measured:
+#
+#     python -m benchmarks.serialization
+#     python -m benchmarks.serialization --formats json --requests 5000
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from functools import partial
+
+from app.wire import COMPACT_MEDIA_TYPE
+from benchmarks.fake_database import FakeDatabase
+
+FORMATS = {
+    "json": "application/json",
+    "compact": COMPACT_MEDIA_TYPE,
+}
+
+
+async def call(app, method, path, body=b"", media_type="application/json"):
+    # One request straight through the ASGI app; returns (status, body)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("bench", 80), "client": ("bench", 1),
+        "headers": [(b"content-type", media_type.encode()), (b"accept", media_type.encode()),
+                    (b"content-length", str(len(body)).encode())],
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    response = {"status": 0, "body": b""}
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["body"]
+
+
+def new_game(board_size, fmt):
+    board = [''] * (board_size * board_size)
+    board[0] = 'X'
+    game = {
+        "board": "".join(cell or "." for cell in board) if fmt == "compact" else board,
+        "board_size": board_size, "win_length": min(board_size, 5),
+        "human_player": "X", "ai_player": "O", "current_player": "O",
+        "difficulty": "easy", "game_active": True,
+    }
+    return json.dumps(game).encode()
+
+
+async def measure(name, request, count):
+    # Median CPU time per request over five rounds
+    status, body = await request()
+    assert status == 200, (name, status, body[:200])
+    rounds = []
+    for _ in range(5):
+        start = time.process_time()
+        for _ in range(count):
+            await request()
+        rounds.append((time.process_time() - start) / count)
+    return statistics.median(rounds), body
+
+
+async def run(formats, count):
+    from app import main
+
+    FakeDatabase().install(main)
+    app = main.app
+    results = []
+    for fmt in formats:
+        media_type = FORMATS[fmt]
+        for board_size in (3, 15):
+            body = new_game(board_size, fmt)
+            _, created = await call(app, "POST", "/games", body, media_type)
+            game_id = json.loads(created)["id"]
+            path = f"/games/{game_id}"
+            cases = {
+                "GET /games/{id}": partial(call, app, "GET", path, b"", media_type),
+                "PUT /games/{id}": partial(call, app, "PUT", path, body, media_type),
+                "POST /ai-move": partial(call, app, "POST", "/ai-move", body, media_type),
+            }
+            for case, request in cases.items():
+                seconds, response = await measure(case, request, count)
+                sent = 0 if case.startswith("GET") else len(body)
+                results.append((fmt, f"{board_size}x{board_size}", case, seconds, sent, len(response)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization")
+    parser.add_argument("--formats", nargs="+", choices=tuple(FORMATS), default=tuple(FORMATS))
+    parser.add_argument("--requests", type=int, default=2000, help="requests per timing round")
+    args = parser.parse_args(argv)
+
+    print(f"{'format':<8} {'board':<6} {'endpoint':<18} {'cpu/request':>12} {'request':>9} {'response':>9}")
+    for fmt, board, case, seconds, sent, received in asyncio.run(run(args.formats, args.requests)):
+        print(f"{fmt:<8} {board:<6} {case:<18} {seconds * 1e6:>9.1f} us {sent:>7} B {received:>7} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import pytest
+
+from app import main
+from app.game_cache import GameCache
+from benchmarks.fake_database import FUNCTIONS, FakeDatabase
+
+
+@pytest.fixture
+def fake_database(monkeypatch):
+    # Points app.main at an in-memory database, with an empty game cache,
+    # and restores the real ones afterwards
+    for name in FUNCTIONS:
+        monkeypatch.setattr(main, name, getattr(main, name))
+    # Ids restart at 1 in every fake, so games cached by earlier tests go too
+    monkeypatch.setattr(main, "game_cache", GameCache(main.save_games))
+    fake = FakeDatabase()
+    fake.install(main)
+    return fake
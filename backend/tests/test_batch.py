@@ -0,0 +1,126 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.batch import BatchSolver
+from app.engine_pool import EnginePool
+
+
+def position(board, difficulty='hard', board_size=3, win_length=3, seed=None):
+    return SimpleNamespace(
+        board=board,
+        human_player='X',
+        ai_player='O',
+        difficulty=difficulty,
+        board_size=board_size,
+        win_length=win_length,
+        seed=seed
+    )
+
+
+async def play_inline(fn, positions, time_limit):
+    return fn(positions, time_limit)
+
+
+def solve(solver, positions, chunk_size=256, chunk_seconds=1):
+    async def collect():
+        return [result async for chunk in solver.stream(positions, play_inline, chunk_size, chunk_seconds)
+                for result in chunk]
+    return asyncio.run(collect())
+
+
+def test_duplicate_hard_positions_are_solved_once():
+    solver = BatchSolver()
+    board = ['X', 'X', '', '', 'O', '', '', '', '']
+    results = solve(solver, [position(board), position(list(board)), position(board)])
+    assert [result["move"] for result in results] == [2, 2, 2]
+    assert solver.solved == 1
+    assert solver.duplicates == 2
+
+
+def test_random_difficulties_are_not_deduplicated():
+    solver = BatchSolver()
+    board = ['X', '', '', '', '', '', '', '', '']
+    solve(solver, [position(board, 'easy'), position(board, 'easy')])
+    assert solver.solved == 2
+
+
+def test_seeded_random_difficulties_are_deduplicated():
+    solver = BatchSolver()
+    board = ['X', '', '', '', '', '', '', '', '']
+    first, second = solve(solver, [position(board, 'easy', seed=5), position(board, 'easy', seed=5)])
+    assert first == second
+    assert solver.solved == 1
+    assert solver.duplicates == 1
+
+
+def test_outcomes():
+    solver = BatchSolver()
+    win, over, tie = solve(solver, [
+        position(['O', 'O', '', 'X', 'X', '', 'X', '', '']),
+        position(['X', 'X', 'X', 'O', 'O', '', '', '', '']),
+        position(['X', 'O', 'X', 'X', 'O', 'O', 'O', 'X', '']),
+    ])
+    assert win == {"move": 2, "winner": "O", "game_active": False}
+    assert over == {"move": None, "winner": "X", "game_active": False}
+    assert tie == {"move": 8, "winner": "tie", "game_active": False}
+
+
+def test_larger_boards():
+    solver = BatchSolver(time_limit=0.01)
+    board = [''] * 16
+    board[0] = board[1] = board[2] = 'X'
+    result, = solve(solver, [position(board, board_size=4, win_length=4)])
+    assert result["move"] == 3
+
+
+def test_stream_sends_new_positions_in_chunks():
+    calls = []
+
+    async def run(fn, positions, time_limit):
+        calls.append(len(positions))
+        return fn(positions, time_limit)
+
+    async def collect(solver, positions, **options):
+        return [chunk async for chunk in solver.stream(positions, run, **options)]
+
+    solver = BatchSolver(time_limit=0.01)
+    blocked = position(['X', 'X', '', '', 'O', '', '', '', ''])
+    opening = position(['X', '', '', '', '', '', '', '', ''])
+    chunks = asyncio.run(collect(solver, [blocked, opening, blocked, opening, blocked],
+                                 chunk_size=2, chunk_seconds=1, window=2))
+    assert [[result["move"] for result in chunk] for chunk in chunks] == [[2, 4], [2, 4], [2]]
+    # Duplicates in later chunks are not sent again
+    assert calls == [2, 0, 0]
+    assert (solver.solved, solver.duplicates) == (2, 3)
+
+    # Each larger-board search counts its deadline against chunk_seconds
+    calls.clear()
+    board = [''] * 16
+    board[0] = board[1] = board[2] = 'X'
+    larger = [position(list(board), board_size=4, win_length=4) for _ in range(3)]
+    chunks = asyncio.run(collect(BatchSolver(time_limit=0.01), larger, chunk_size=256, chunk_seconds=0.02))
+    assert calls == [2, 1]
+    assert [result["move"] for chunk in chunks for result in chunk] == [3, 3, 3]
+
+
+def test_batch_endpoint(monkeypatch):
+    monkeypatch.setattr(main, "engine_pool", EnginePool(workers=0))
+    client = TestClient(main.app)
+    positions = [{"board": "XX..O....", "human_player": "X", "ai_player": "O", "difficulty": "hard"}] * 3
+    body = client.post("/ai-move/batch", json={"positions": positions}).json()
+    assert [result["move"] for result in body["results"]] == [2, 2, 2]
+    assert (body["solved"], body["duplicates"]) == (1, 2)
+
+    lines = client.post("/ai-move/batch", params={"stream": "true"}, json={"positions": positions}).text.splitlines()
+    assert [json.loads(line)["move"] for line in lines] == [2, 2, 2]
+
+    # Larger-board searches are capped per request
+    monkeypatch.setattr(main, "MAX_BATCH_SEARCH_SECONDS", 0.1)
+    larger = {"board": "." * 49, "human_player": "X", "ai_player": "O", "difficulty": "hard",
+              "board_size": 7, "win_length": 5}
+    response = client.post("/ai-move/batch", params={"deadline_ms": 50}, json={"positions": [larger] * 3})
+    assert response.status_code == 413
@@ -0,0 +1,74 @@
+from app.bitboard import (
+    FULL_MASK,
+    THREATS,
+    WIN_MASKS,
+    cells_of,
+    decode,
+    encode,
+    get_geometry,
+    is_full,
+    is_win,
+    legal_moves,
+)
+
+
+def test_encode_decode_round_trip():
+    board = ['X', 'O', '', '', 'X', '', 'O', '', 'X']
+    x_bits = encode(board, 'X')
+    o_bits = encode(board, 'O')
+    assert x_bits == 0b100010001
+    assert o_bits == 0b001000010
+    assert decode(x_bits, o_bits) == board
+
+
+def test_is_win():
+    for mask in WIN_MASKS:
+        assert is_win(mask) is True
+        assert is_win(mask | 0b1) is True
+    assert is_win(0b000010011) is False
+    assert is_win(0) is False
+
+
+def test_is_full():
+    assert is_full(FULL_MASK) is True
+    assert is_full(FULL_MASK & ~(1 << 4)) is False
+
+
+def test_legal_moves():
+    assert legal_moves(0) == tuple(range(9))
+    assert legal_moves(0b100010001) == (1, 2, 3, 5, 6, 7)
+    assert legal_moves(FULL_MASK) == ()
+
+
+def test_geometry_line_counts():
+    assert len(get_geometry(3, 3).win_masks) == 8
+    assert set(get_geometry(3, 3).win_masks) == set(WIN_MASKS)
+    assert len(get_geometry(4, 4).win_masks) == 10
+    # Gomoku: 11 windows per row and column, 11 * 11 per diagonal direction
+    assert len(get_geometry(15, 5).win_masks) == 15 * 11 * 2 + 11 * 11 * 2
+
+
+def test_geometry_wins_at_only_checks_lines_through_cell():
+    geometry = get_geometry(5, 4)
+    row = 0b1111 << 5  # cells 5-8
+    assert geometry.has_win(row) is True
+    assert geometry.wins_at(row, 6) is True
+    assert geometry.wins_at(row, 0) is False
+
+
+def test_geometry_layout():
+    geometry = get_geometry(4, 3)
+    assert geometry.corners == (0, 3, 12, 15)
+    assert geometry.edges == (1, 2, 4, 7, 8, 11, 13, 14)
+    assert geometry.center_order[:4] == (5, 6, 9, 10)
+    assert geometry.legal_moves(geometry.full_mask & ~0b11) == [0, 1]
+
+
+def test_threats():
+    # X on 0 and 1 threatens 2; X on 0 and 4 threatens 8
+    assert cells_of(THREATS[0b000000011]) == [2]
+    assert cells_of(THREATS[0b000010011]) == [2, 7, 8]
+    assert THREATS[0] == 0
+    geometry = get_geometry(4, 3)
+    assert cells_of(geometry.threats(0b11)) == [2]
+    assert get_geometry(3, 3).threats(0b11) == THREATS[0b11]
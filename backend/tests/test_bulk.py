@@ -0,0 +1,41 @@
+import io
+
+from app.bulk import read_csv, read_ndjson
+from app.database import _export_query, _game_values
+
+CSV_EXPORT = """id,board,board_size,win_length,human_player,ai_player,current_player,difficulty,game_active,winner,score_x,score_o,updated_at
+1,XXXOO....,3,3,X,O,O,hard,f,X,1,0,2026-01-01 00:00:00+00
+2,.........,3,3,X,O,X,easy,t,,0,0,2026-01-01 00:00:00+00
+"""
+
+
+def test_read_csv_export():
+    games = list(read_csv(io.StringIO(CSV_EXPORT)))
+    assert games[0]["board"] == ['X', 'X', 'X', 'O', 'O', '', '', '', '']
+    assert games[0]["game_active"] is False
+    assert games[0]["winner"] == "X"
+    assert games[0]["score_x"] == 1
+    assert games[1]["game_active"] is True
+    assert games[1]["winner"] is None
+    # Ready for COPY
+    assert _game_values(games[0])[0] == "XXXOO...."
+
+
+def test_read_ndjson_fills_defaults():
+    lines = io.StringIO(
+        '{"board": ["X", "", "", "", "", "", "", "", ""], "human_player": "X", "ai_player": "O",'
+        ' "current_player": "O", "difficulty": "normal", "game_active": true}\n\n'
+    )
+    [game] = read_ndjson(lines)
+    assert game["board_size"] == 3
+    assert game["winner"] is None
+    assert _game_values(game)[0] == "X........"
+
+
+def test_export_query_includes_archive_for_finished_games():
+    query, options = _export_query("csv", "finished")
+    assert "games_archive" in query
+    assert options["header"] is True
+    query, _ = _export_query("ndjson", "active")
+    assert "games_archive" not in query
+    assert query.startswith("SELECT row_to_json(g)")
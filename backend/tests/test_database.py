@@ -0,0 +1,51 @@
+from app.database import (
+    GAME_COLUMNS,
+    _board_from_text,
+    _board_to_text,
+    _game_from_row,
+    _game_values,
+)
+from app.migrations import MIGRATIONS
+
+
+def make_game():
+    return {
+        "id": 7,
+        "board": ['X', '', '', '', 'O', '', '', '', ''],
+        "board_size": 3,
+        "win_length": 3,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "X",
+        "difficulty": "hard",
+        "game_active": True,
+        "winner": None,
+        "score_x": 0,
+        "score_o": 0,
+        "seed": 12345
+    }
+
+
+def test_game_values_follow_column_order():
+    values = _game_values(make_game())
+    assert len(values) == len(GAME_COLUMNS)
+    assert values[0] == "X...O...."
+    assert values[GAME_COLUMNS.index("difficulty")] == "hard"
+
+
+def test_game_from_row_decodes_board():
+    game = make_game()
+    row = {"id": 7, **dict(zip(GAME_COLUMNS, _game_values(game)))}
+    assert _game_from_row(row) == game
+
+
+def test_board_text_round_trip():
+    board = [''] * 225
+    board[0], board[112], board[224] = 'X', 'O', 'X'
+    text = _board_to_text(board)
+    assert len(text) == 225
+    assert _board_from_text(text) == board
+
+
+def test_migration_versions_are_sequential():
+    assert [version for version, _, _ in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.engine_pool import EnginePool
+from app.solver import lookup_best_move
+
+BOARD = ['X', 'X', '', '', 'O', '', '', '', '']
+
+
+def run_in_pool(pool, fn, *args):
+    async def run():
+        pool.start()
+        try:
+            return await pool.run(fn, *args)
+        finally:
+            pool.stop()
+    return asyncio.run(run())
+
+
+def test_search_runs_in_worker_process():
+    pool = EnginePool(workers=1, max_pending=4, timeout=30)
+    assert run_in_pool(pool, lookup_best_move, BOARD, 'O', 'X')[0] == 2
+    assert pool.pending == 0
+
+
+def test_falls_back_in_process_when_saturated():
+    pool = EnginePool(workers=1, max_pending=0, timeout=30)
+    assert run_in_pool(pool, lookup_best_move, BOARD, 'O', 'X')[0] == 2
+
+
+def test_falls_back_in_process_when_disabled():
+    pool = EnginePool(workers=0)
+    assert run_in_pool(pool, lookup_best_move, BOARD, 'O', 'X')[0] == 2
+
+
+def test_task_timeout():
+    pool = EnginePool(workers=1, max_pending=4, timeout=0.1)
+    with pytest.raises(HTTPException) as error:
+        run_in_pool(pool, time.sleep, 5)
+    assert error.value.status_code == 504
+
+
+def test_timed_out_task_stays_pending_until_done():
+    async def run(pool):
+        pool.start()
+        try:
+            await pool.warm()
+            with pytest.raises(HTTPException):
+                await pool.run(time.sleep, 0.5)
+            # The worker is still sleeping
+            assert pool.pending == 1
+            deadline = time.monotonic() + 10
+            while pool.pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            return pool.pending
+        finally:
+            pool.stop()
+    assert asyncio.run(run(EnginePool(workers=1, max_pending=4, timeout=0.1))) == 0
+
+
+def test_warm_starts_every_worker():
+    async def warm(pool):
+        pool.start()
+        try:
+            return await pool.warm()
+        finally:
+            pool.stop()
+    assert asyncio.run(warm(EnginePool(workers=2, timeout=30))) == 2
+    assert asyncio.run(warm(EnginePool(workers=0))) == 0
+
+
+def test_pool_is_replaced_when_a_worker_dies():
+    async def run(pool):
+        pool.start()
+        try:
+            pid = await pool.run(os.getpid)
+            search = asyncio.ensure_future(pool.run(time.sleep, 1))
+            await asyncio.sleep(0.2)
+            os.kill(pid, signal.SIGKILL)
+            # The killed search is run again in-process
+            assert await search is None
+            assert pool.pending == 0
+            assert not pool.restart_if_broken()
+            assert (await pool.run(lookup_best_move, BOARD, 'O', 'X'))[0] == 2
+            return pid, await pool.run(os.getpid)
+        finally:
+            pool.stop()
+    killed, replacement = asyncio.run(run(EnginePool(workers=1, max_pending=4, timeout=30)))
+    assert replacement not in (killed, os.getpid())
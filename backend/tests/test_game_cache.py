@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from app.game_cache import GameCache
+
+
+class Writer:
+    # Stands in for save_games; rows holds each game's stored version
+    def __init__(self, fail=False):
+        self.batches = []
+        self.moves = []
+        self.rows = {}
+        self.fail = fail
+
+    async def __call__(self, games, moves):
+        if self.fail:
+            raise RuntimeError("database down")
+        self.batches.append(list(games))
+        skipped = [game_id for game_id, _, base in games if self.rows.get(game_id, base) != base]
+        for game_id, game, _ in games:
+            if game_id not in skipped:
+                self.rows[game_id] = game["version"]
+        self.moves.extend(move for move in moves if move[0] not in skipped)
+        return skipped
+
+
+def game(board_cell='', version=1):
+    return {"id": 1, "board": [board_cell] + [''] * 8, "game_active": True, "version": version}
+
+
+def test_get_miss_then_hit():
+    cache = GameCache(Writer(), max_size=10)
+    assert cache.get(1) is None
+    cache.put(1, game())
+    assert cache.get(1) == game()
+
+
+def test_lru_eviction():
+    cache = GameCache(Writer(), max_size=2)
+    cache.put(1, game())
+    cache.put(2, game())
+    cache.get(1)
+    cache.put(3, game())
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+
+
+def test_ttl_expiry():
+    cache = GameCache(Writer(), max_size=10, ttl=0)
+    cache.put(1, game())
+    assert cache.get(1) is None
+
+
+def test_writes_are_coalesced_and_flushed_in_batches():
+    writer = Writer()
+    cache = GameCache(writer, max_size=10, flush_batch_size=2)
+    cache.write(1, game('X', version=1))
+    cache.write(1, game('O', version=2))
+    cache.write(2, game())
+    cache.write(3, game())
+    assert asyncio.run(cache.flush()) == []
+    assert [len(batch) for batch in writer.batches] == [2, 1]
+    # Written over the version the first write was based on
+    assert writer.batches[0][0] == (1, game('O', version=2), 0)
+    asyncio.run(cache.flush())
+    assert len(writer.batches) == 2
+
+
+def test_dirty_games_survive_eviction():
+    cache = GameCache(Writer(), max_size=1)
+    cache.write(1, game('X'))
+    cache.put(2, game())
+    assert cache.get(1) == game('X')
+
+
+def test_failed_flush_keeps_writes():
+    writer = Writer(fail=True)
+    cache = GameCache(writer, max_size=10)
+    cache.write(1, game('X', version=1))
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.flush())
+    # A write played from the unflushed state still replaces version 0
+    cache.write(1, game('O', version=2))
+    writer.fail = False
+    asyncio.run(cache.flush())
+    assert writer.batches == [[(1, game('O', version=2), 0)]]
+
+
+def test_stop_flushes_pending_writes():
+    writer = Writer()
+
+    async def run():
+        cache = GameCache(writer, max_size=10, flush_interval=60)
+        cache.start()
+        cache.write(1, game('X'))
+        await cache.stop()
+
+    asyncio.run(run())
+    assert writer.batches == [[(1, game('X'), 0)]]
+
+
+def test_flush_game_writes_only_that_game():
+    writer = Writer()
+    cache = GameCache(writer, max_size=10)
+    cache.write(1, game('X'))
+    cache.write(2, game('O'))
+    assert asyncio.run(cache.flush_game(1))
+    assert writer.batches == [[(1, game('X'), 0)]]
+    assert asyncio.run(cache.flush_game(3))
+    asyncio.run(cache.flush())
+    assert writer.batches[1] == [(2, game('O'), 0)]
+
+
+def test_put_keeps_newer_pending_write():
+    writer = Writer()
+    cache = GameCache(writer, max_size=10)
+    # Played from version 1, so newer than a read of version 1
+    cache.write(1, game('X', version=2))
+    cache.put(1, game('O', version=1))
+    assert cache.get(1) == game('X', version=2)
+    # Played from version 1, so stale once version 2 is stored
+    cache.put(1, game('O', version=2))
+    assert cache.get(1) == game('O', version=2)
+    asyncio.run(cache.flush())
+    assert writer.batches == []
+
+
+def test_conflicting_write_is_dropped():
+    writer = Writer()
+    writer.rows[1] = 5
+    cache = GameCache(writer, max_size=10)
+    cache.write(1, game('X', version=4), [(1, 0, 'X')])
+    cache.write(2, game('O', version=1), [(1, 4, 'O')])
+    assert asyncio.run(cache.flush()) == [1]
+    # The next read loads the row again
+    assert cache.get(1) is None
+    assert writer.moves == [(2, 1, 4, 'O')]
+
+    cache.write(1, game('X', version=4))
+    assert not asyncio.run(cache.flush_game(1))
+
+
+def test_moves_are_written_with_their_games():
+    writer = Writer()
+    cache = GameCache(writer, max_size=10)
+    cache.write(1, game('X'), [(1, 0, 'X')])
+    cache.write(1, game('X', version=2), [(2, 4, 'O')])
+    asyncio.run(cache.flush())
+    assert writer.moves == [(1, 1, 0, 'X'), (1, 2, 4, 'O')]
+    assert writer.batches == [[(1, game('X', version=2), 0)]]
+    asyncio.run(cache.flush())
+    assert len(writer.moves) == 2
+
+
+def test_failed_flush_keeps_moves_in_order():
+    writer = Writer(fail=True)
+    cache = GameCache(writer, max_size=10)
+    cache.write(1, game('X'), [(1, 0, 'X')])
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.flush())
+    cache.write(1, game('X', version=2), [(2, 4, 'O')])
+    writer.fail = False
+    asyncio.run(cache.flush_game(1))
+    assert writer.moves == [(1, 1, 0, 'X'), (1, 2, 4, 'O')]
@@ -1,5 +1,7 @@
 import pytest
-from app.game_logic import TicTacToeGame
+
+from app.game_logic import TicTacToeGame, move_random
+
 
 @pytest.fixture
 def new_game():
@@ -77,3 +79,66 @@ def test_ai_hard_move_fork(new_game):
     move = new_game.get_ai_move()
     assert move in [1, 3, 5, 6, 7, 8] # AI should block or create a threat
 
+
+def test_check_win_larger_board():
+    game = TicTacToeGame(
+        board=[''] * 16,
+        human_player='X',
+        ai_player='O',
+        current_player='X',
+        difficulty='hard',
+        game_active=True,
+        winner=None,
+        board_size=4,
+        win_length=3
+    )
+    for index in (5, 10):
+        game.make_move(index, 'X')
+    assert game.check_win('X') is False
+    game.make_move(15, 'X')
+    assert game.check_win('X') is True
+    assert game.check_win_at(15, 'X') is True
+
+def test_ai_hard_move_block_larger_board():
+    board = [''] * 25
+    board[0] = board[1] = board[2] = 'X'
+    board[12] = board[13] = 'O'
+    game = TicTacToeGame(board, 'X', 'O', 'O', 'hard', True, None, board_size=5, win_length=4)
+    assert game.get_ai_move() == 3
+
+def test_ai_hard_move_reports_search(new_game):
+    new_game.difficulty = 'hard'
+    new_game.board = ['X', '', '', '', '', '', '', '', '']
+    new_game.get_ai_move()
+    assert new_game.last_search.depth == 8
+
+def test_ai_hard_move_with_other_symbols():
+    # Same replies as with X and O, from the table rather than plain minimax
+    for board in ([''] * 9, ['A', 'A', '', '', 'B', '', '', '', '']):
+        game = TicTacToeGame(list(board), 'A', 'B', 'B', 'hard', True, None)
+        xo = TicTacToeGame([{'A': 'X', 'B': 'O'}.get(cell, '') for cell in board], 'X', 'O', 'O', 'hard', True, None)
+        assert game.get_ai_move() == xo.get_ai_move()
+        assert game.last_search.depth == board.count('')
+        assert game.last_search.table_hits == 1
+
+def test_seeded_moves_are_reproducible():
+    board = ['X', '', '', '', '', '', '', '', '']
+    for difficulty in ('easy', 'normal'):
+        moves = {
+            TicTacToeGame(list(board), 'X', 'O', 'O', difficulty, True, None, seed=42).get_ai_move()
+            for _ in range(20)
+        }
+        assert len(moves) == 1
+
+def test_move_random_depends_on_seed_and_ply():
+    draws = lambda seed, ply: [move_random(seed, ply).random() for _ in range(3)]
+    assert draws(1, 2) == draws(1, 2)
+    assert draws(1, 2) != draws(1, 3)
+    assert draws(1, 2) != draws(2, 2)
+    assert all(0 <= value < 1 for value in draws(7, 0))
+
+def test_smart_move_wins_before_blocking(new_game):
+    new_game.board = ['X', 'X', '', 'O', 'O', '', '', '', '']
+    assert new_game._get_smart_move([2, 5, 6, 7, 8]) == 5
+    new_game.board = ['X', 'X', '', '', 'O', '', '', '', '']
+    assert new_game._get_smart_move([2, 3, 5, 6, 7, 8]) == 2
@@ -0,0 +1,28 @@
+import asyncio
+
+from app import main
+from benchmarks.load_test import parse_mix, percentile, run_in_process
+
+
+def test_parse_mix():
+    assert parse_mix("easy=1, hard=3") == [("easy", 1.0), ("hard", 3.0)]
+    assert parse_mix("normal") == [("normal", 1.0)]
+
+
+def test_percentile():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert percentile(values, 0.5) == 5
+    assert percentile(values, 0.9) == 9
+    assert percentile(values, 1.0) == 10
+    assert percentile([], 0.5) == 0.0
+
+
+def test_games_play_through_against_fake_database(fake_database, monkeypatch):
+    monkeypatch.setattr(main.engine_pool, "workers", 0)
+
+    stats, _ = asyncio.run(run_in_process(
+        players=4, seconds=0.3, mix=[("easy", 1.0), ("hard", 1.0)]
+    ))
+    assert stats.games > 0
+    assert not stats.errors
+    assert len(stats.latencies["GET /games/{id}"]) == stats.games
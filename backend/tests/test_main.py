@@ -1,9 +1,12 @@
+import os
+
+import psycopg2
 import pytest
 from httpx import AsyncClient
+
+from app.database import migrate
 from app.main import app
-from app.database import get_db_connection, create_table
-import psycopg2
-import os
+
 
 # Override database connection for testing
 @pytest.fixture(name="test_db_conn")
@@ -54,7 +57,7 @@ def test_db_conn():
 @pytest.fixture(name="client")
 async def client_fixture(test_db_conn):
     # Ensure tables are created for each test run
-    create_table()
+    await migrate()
     async with AsyncClient(app=app, base_url="http://test") as client:
         yield client
 
@@ -219,3 +222,41 @@ async def test_update_game(client):
     assert update_response.json()["board"] == updated_board
     assert update_response.json()["current_player"] == "O"
 
+
+@pytest.mark.asyncio
+async def test_make_move(client):
+    create_response = await client.post(
+        "/games",
+        json={
+            "board": ['', '', '', '', '', '', '', '', ''],
+            "human_player": "X",
+            "ai_player": "O",
+            "current_player": "X",
+            "difficulty": "hard",
+            "game_active": True,
+            "winner": None,
+            "score_x": 0,
+            "score_o": 0
+        }
+    )
+    game_id = create_response.json()["id"]
+
+    move_response = await client.post(f"/games/{game_id}/moves", json={"cell": 0})
+    assert move_response.status_code == 200
+    moved_game = move_response.json()
+    assert moved_game["board"][0] == "X"
+    assert moved_game["board"].count("O") == 1
+    assert moved_game["current_player"] == "X"
+
+    # The move and the AI reply were persisted
+    get_response = await client.get(f"/games/{game_id}")
+    assert get_response.json()["board"] == moved_game["board"]
+
+    # Playing the same cell again is rejected
+    repeat_response = await client.post(f"/games/{game_id}/moves", json={"cell": 0})
+    assert repeat_response.status_code == 409
+
+@pytest.mark.asyncio
+async def test_make_move_game_not_found(client):
+    response = await client.post("/games/999999/moves", json={"cell": 0})
+    assert response.status_code == 404
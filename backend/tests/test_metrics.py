@@ -0,0 +1,69 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app import main
+from app.main import SearchInfo
+from app.main import app as main_app
+from app.metrics import RequestMetricsMiddleware, observe_search
+from app.move_cache import MoveCache
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/things/{thing_id}")
+    def get_thing(thing_id: int):
+        return thing_id
+
+    labels = {"method": "GET", "route": "/things/{thing_id}", "status": "200"}
+    before = sample("http_request_seconds_count", labels)
+    client = TestClient(app)
+    client.get("/things/1")
+    client.get("/things/2")
+    assert sample("http_request_seconds_count", labels) == before + 2
+
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = sample("http_request_seconds_count", unmatched)
+    client.get("/nowhere")
+    assert sample("http_request_seconds_count", unmatched) == before + 1
+
+
+def test_observe_search_counts_table_lookups():
+    hits = {"difficulty": "test", "result": "hit"}
+    misses = {"difficulty": "test", "result": "miss"}
+    observe_search("test", SearchInfo(depth=5, nodes=0, elapsed_ms=0.01, table_hits=1))
+    observe_search("test", SearchInfo(depth=5, nodes=100, elapsed_ms=2.0, table_hits=30))
+    assert sample("engine_table_lookups_total", hits) == 31
+    assert sample("engine_table_lookups_total", misses) == 70
+    assert sample("engine_search_nodes_count", {"difficulty": "test"}) == 2
+
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(main, "move_cache", MoveCache())
+    client = TestClient(main_app)
+    game = {
+        "board": ['X', '', '', '', '', '', '', '', ''],
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "O",
+        "difficulty": "hard",
+        "game_active": True,
+    }
+    hits = sample("move_cache_lookups_total", {"result": "local_hit"})
+    response = client.post("/ai-move", json=game)
+    assert response.status_code == 200
+    assert response.json()["search"]["table_hits"] == 1
+    client.post("/ai-move", json=game)
+    assert sample("move_cache_lookups_total", {"result": "local_hit"}) == hits + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_seconds_count{method="POST",route="/ai-move",status="200"}' in response.text
+    assert 'engine_table_lookups_total{difficulty="hard",result="hit"}' in response.text
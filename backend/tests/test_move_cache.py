@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.game_logic import TicTacToeGame
+from app.move_cache import MoveCache, canonical_board, canonical_position, is_cacheable
+from app.search import SYMMETRIES
+
+
+class SharedStandIn:
+    # Dict-backed stand-in for the redis.asyncio client
+    def __init__(self, fail=False):
+        self.values = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("down")
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("down")
+        self.values[key] = str(value).encode()
+
+
+def rotated(board, perm):
+    return [board[perm[i]] for i in range(9)]
+
+
+def test_symmetric_positions_share_a_key():
+    board = ['X', 'X', '', '', 'O', '', '', '', '']
+    key, _ = canonical_position(board, 'O', 'X')
+    for perm in SYMMETRIES:
+        other = rotated(board, perm)
+        other_key, other_symmetry = canonical_position(other, 'O', 'X')
+        assert other_key == key
+        # The canonical board maps back onto each orientation
+        canonical = canonical_board(key)
+        assert all(other[other_symmetry[cell]] == canonical[cell] for cell in range(9))
+
+
+def test_mapped_move_blocks_in_every_orientation():
+    board = ['X', 'X', '', '', 'O', '', '', '', '']
+    key, _ = canonical_position(board, 'O', 'X')
+    move = TicTacToeGame(canonical_board(key), 'X', 'O', 'O', 'hard', True, None).get_ai_move()
+    for perm in SYMMETRIES:
+        other = rotated(board, perm)
+        _, symmetry = canonical_position(other, 'O', 'X')
+        reply = list(other)
+        reply[symmetry[move]] = 'O'
+        # The blocking cell is the one that completes X's line
+        assert reply[perm.index(2)] == 'O'
+
+
+def test_is_cacheable():
+    game = main.Game(board=['X'] + [''] * 8, human_player='X', ai_player='O', current_player='O',
+                     difficulty='hard', game_active=True)
+    assert is_cacheable(game)
+    assert not is_cacheable(game.model_copy(update={"difficulty": "easy"}))
+    assert not is_cacheable(game.model_copy(update={"board": ['X', 'X', 'X', 'O', 'O', '', '', '', '']}))
+
+
+def test_lru_eviction():
+    cache = MoveCache(max_size=2)
+    asyncio.run(cache.set(1, 4))
+    asyncio.run(cache.set(2, 0))
+    assert asyncio.run(cache.get(1)) == 4
+    asyncio.run(cache.set(3, 8))
+    assert asyncio.run(cache.get(2)) is None
+    assert asyncio.run(cache.get(1)) == 4
+
+
+def test_shared_cache_between_processes():
+    shared = SharedStandIn()
+    asyncio.run(MoveCache(shared=shared).set(7, 0))
+    other = MoveCache(shared=shared)
+    assert asyncio.run(other.get(7)) == 0
+    # Now held locally too
+    shared.values.clear()
+    assert asyncio.run(other.get(7)) == 0
+
+
+def test_shared_cache_errors_are_misses():
+    cache = MoveCache(shared=SharedStandIn(fail=True))
+    asyncio.run(cache.set(7, 0))
+    assert asyncio.run(MoveCache(shared=SharedStandIn(fail=True)).get(7)) is None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "move_cache", MoveCache(max_size=100, shared=SharedStandIn()))
+    return TestClient(main.app)
+
+
+def test_ai_move_is_cached_across_orientations(client):
+    board = ['X', 'X', '', '', 'O', '', '', '', '']
+    game = {"board": board, "human_player": "X", "ai_player": "O", "current_player": "O",
+            "difficulty": "hard", "game_active": True}
+    first = client.post("/ai-move", json=game).json()
+    assert first["board"][2] == 'O'
+    assert first["search"]["cached"] is False
+
+    perm = SYMMETRIES[3]
+    second = client.post("/ai-move", json={**game, "board": rotated(board, perm)}).json()
+    assert second["search"]["cached"] is True
+    assert second["board"][perm.index(2)] == 'O'
@@ -0,0 +1,219 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import new_moves
+from benchmarks.fake_database import FakeDatabase
+
+
+def state(board, current_player):
+    return {"board": board, "current_player": current_player}
+
+
+def test_new_moves_in_play_order():
+    before = state(['X', '', '', '', '', '', '', '', ''], 'O')
+    after = state(['X', 'X', '', '', 'O', '', '', '', ''], 'X')
+    assert new_moves(before, after) == [(2, 4, 'O'), (3, 1, 'X')]
+
+
+def test_no_new_moves():
+    board = ['X', '', '', '', '', '', '', '', '']
+    assert new_moves(state(board, 'O'), state(list(board), 'O')) == []
+
+
+@pytest.fixture
+def client(fake_database):
+    return TestClient(main.app)
+
+
+def test_replay(client):
+    game = client.post("/games", json={
+        "board": [''] * 9,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "X",
+        "difficulty": "hard",
+        "game_active": True,
+    }).json()
+    # One turn through PUT, then one through the moves endpoint
+    game["board"][4] = "X"
+    game["current_player"] = "O"
+    client.put(f"/games/{game['id']}", json=game)
+    board = client.post(f"/games/{game['id']}/moves", json={}).json()["board"]
+    played = client.post(f"/games/{game['id']}/moves", json={"cell": board.index('')}).json()
+
+    replay = client.get(f"/games/{game['id']}/replay").json()
+    assert replay["total_plies"] == 4
+    assert replay["board"] == played["board"]
+    assert [move["ply"] for move in replay["moves"]] == [1, 2, 3, 4]
+
+    first = client.get(f"/games/{game['id']}/replay", params={"ply": 1}).json()
+    assert first["board"] == ['', '', '', '', 'X', '', '', '', '']
+    assert client.get(f"/games/{game['id']}/replay", params={"ply": 5}).status_code == 400
+    assert client.get("/games/999/replay").status_code == 404
+
+
+def test_games_keep_their_seed(client):
+    game = client.post("/games", json={
+        "board": [''] * 9,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "X",
+        "difficulty": "easy",
+        "game_active": True,
+    }).json()
+    assert 0 <= game["seed"] <= main.MAX_SEED
+    game["board"][0] = "X"
+    game["current_player"] = "O"
+    seed = game.pop("seed")
+    client.put(f"/games/{game['id']}", json=game)
+    assert client.get(f"/games/{game['id']}").json()["seed"] == seed
+
+    # The same seeded position always gets the same reply
+    replies = {tuple(client.post("/ai-move", json={**game, "seed": seed}).json()["board"]) for _ in range(5)}
+    assert len(replies) == 1
+    assert client.post("/ai-move", json={**game, "seed": -1}).status_code == 400
+
+
+def test_update_unknown_game(client):
+    game = {"board": [''] * 9, "human_player": "X", "ai_player": "O", "current_player": "X",
+            "difficulty": "easy", "game_active": True}
+    assert client.put("/games/4242", json=game).status_code == 404
+    assert client.post("/ai-move", json={**game, "id": 4242, "current_player": "O"}).status_code == 404
+    # Nothing was cached for it
+    assert client.get("/games/4242").status_code == 404
+
+
+def test_player_and_difficulty_are_validated(client):
+    game = {"board": [''] * 9, "human_player": "X", "ai_player": "O", "current_player": "X",
+            "difficulty": "easy", "game_active": True}
+    for change in ({"current_player": "ZZ"}, {"current_player": "Y"}, {"difficulty": "impossible"}):
+        assert client.post("/games", json={**game, **change}).status_code == 400
+        assert client.post("/ai-move", json={**game, **change}).status_code == 400
+    assert client.post("/games", json=game).status_code == 200
+
+
+def test_only_the_search_goes_to_the_engine_pool(client, monkeypatch):
+    # Workers unpickle the submitted function by reference, so it must not
+    # live in app.main, which would import the whole app in every worker
+    submitted = []
+    run = main.engine_pool.run
+
+    async def record(fn, *args):
+        submitted.append(fn)
+        return await run(fn, *args)
+    monkeypatch.setattr(main.engine_pool, "run", record)
+    monkeypatch.setattr(main.move_cache, "max_size", 0)
+    response = client.post("/ai-move", json={
+        "board": ['X', '', '', '', '', '', '', '', ''],
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "O",
+        "difficulty": "hard",
+        "game_active": True,
+    })
+    assert response.status_code == 200
+    assert [fn.__module__ for fn in submitted] == ["app.sessions"]
+
+
+def test_fixed_columns_cannot_change(client):
+    game = client.post("/games", json={
+        "board": [''] * 9,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "X",
+        "difficulty": "easy",
+        "game_active": True,
+    }).json()
+    response = client.put(f"/games/{game['id']}", json={**game, "difficulty": "hard"})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "difficulty cannot change after a game is created"
+
+    game["board"][0] = "X"
+    game["current_player"] = "O"
+    assert client.put(f"/games/{game['id']}", json=game).status_code == 200
+    assert client.get(f"/games/{game['id']}").json()["board"][0] == "X"
+
+
+def test_write_from_a_stale_copy_is_refused(client, fake_database):
+    game = client.post("/games", json={
+        "board": ['X', 'X', '', 'O', 'O', '', '', '', ''],
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "X",
+        "difficulty": "easy",
+        "game_active": True,
+    }).json()
+    assert game["version"] == 0
+    # Another worker plays a move this one has not seen
+    stored = fake_database.games[game["id"]]
+    stored.update(board=['X', 'X', '', 'O', 'O', '', 'X', '', ''], current_player="O", version=1)
+
+    game.update(board=['X', 'X', 'X', 'O', 'O', '', '', '', ''], game_active=False, winner="X")
+    response = client.put(f"/games/{game['id']}", json=game)
+    assert response.status_code == 409
+    assert fake_database.games[game["id"]]["board"][6] == "X"
+    assert client.get(f"/games/{game['id']}").json()["version"] == 1
+
+
+def test_move_search_holds_no_connection(fake_database, monkeypatch):
+    # With one connection, the search could not reach the database if the
+    # endpoint kept its connection open around it
+    fake = FakeDatabase(max_connections=1)
+    fake.install(main)
+    client = TestClient(main.app)
+    run_engine = main.run_engine
+
+    async def concurrent(*args):
+        result = await run_engine(*args)
+        stored = fake.games[1]
+        stored.update(version=stored["version"] + 1)
+        await asyncio.wait_for(fake.ping_database(), 1)
+        return result
+    monkeypatch.setattr(main, "run_engine", concurrent)
+    game = client.post("/games", json={
+        "board": [''] * 9,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "X",
+        "difficulty": "normal",
+        "game_active": True,
+    }).json()
+    # The row changed during the search, so the turn is refused
+    response = client.post(f"/games/{game['id']}/moves", json={"cell": 4})
+    assert response.status_code == 409
+    assert fake.games[1]["board"] == [''] * 9
+    assert fake.moves == {}
+
+
+def test_archived_games_are_read_only(client, fake_database):
+    game = {
+        "id": 1,
+        "board": ['X', 'X', 'X', 'O', 'O', '', '', '', ''],
+        "board_size": 3,
+        "win_length": 3,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "O",
+        "difficulty": "easy",
+        "game_active": False,
+        "winner": "X",
+        "score_x": 1,
+        "score_o": 0,
+        "seed": 7,
+        "version": 3,
+    }
+    fake_database.archived[1] = game
+
+    assert client.get("/games/1").json()["winner"] == "X"
+    restarted = {**game, "board": [''] * 9, "current_player": "X", "game_active": True, "winner": None}
+    for response in (
+        client.put("/games/1", json=restarted),
+        client.post("/ai-move", json={**restarted, "current_player": "O"}),
+        client.post("/games/1/moves", json={"cell": 4}),
+    ):
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Game is archived and can no longer change"
+    assert client.put("/games/2", json=restarted).status_code == 404
@@ -0,0 +1,72 @@
+import marshal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+GAME = {
+    "board": ['X', '', '', '', '', '', '', '', ''],
+    "human_player": "X",
+    "ai_player": "O",
+    "current_player": "O",
+    "difficulty": "hard",
+    "game_active": True,
+}
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main.profiler, "admin_token", "secret")
+    monkeypatch.setattr(main.profiler, "sample_rate", 0.0)
+    return TestClient(main.app)
+
+
+def test_profiling_is_off_without_token(monkeypatch):
+    monkeypatch.setattr(main.profiler, "admin_token", "")
+    client = TestClient(main.app)
+    response = client.post("/ai-move", json=GAME, headers={"X-Profile": "1", **ADMIN})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert client.get("/admin/profiling", headers=ADMIN).status_code == 404
+
+
+def test_profile_requested_by_header(client):
+    response = client.post("/ai-move", json=GAME, headers={"X-Profile": "1", **ADMIN})
+    assert response.status_code == 200
+    report_id = response.headers["x-profile-id"]
+
+    report = client.get(f"/admin/profiling/reports/{report_id}", headers=ADMIN).json()
+    assert report["path"] == "/ai-move"
+    assert report["status"] == 200
+    assert "play_ai_turn" in report["top_functions"]
+
+    collapsed = client.get(f"/admin/profiling/reports/{report_id}/collapsed", headers=ADMIN).text
+    for line in collapsed.splitlines():
+        _, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+
+    stats = marshal.loads(client.get(f"/admin/profiling/reports/{report_id}/pstats", headers=ADMIN).content)
+    assert any(function[2] == "play_ai_turn" for function in stats)
+
+
+def test_header_needs_admin_token(client):
+    response = client.post("/ai-move", json=GAME, headers={"X-Profile": "1", "X-Admin-Token": "wrong"})
+    assert "x-profile-id" not in response.headers
+    assert not main.profiler.authorized(None)
+    assert not main.profiler.authorized("sécret")
+    assert main.profiler.authorized("secret")
+
+
+def test_sample_rate(client):
+    assert client.put("/admin/profiling", json={"sample_rate": 1.0}).status_code == 403
+    assert client.put("/admin/profiling", json={"sample_rate": 2.0}, headers=ADMIN).status_code == 400
+    assert client.put("/admin/profiling", json={"sample_rate": 1.0}, headers=ADMIN).status_code == 200
+
+    response = client.post("/ai-move", json=GAME)
+    report_id = int(response.headers["x-profile-id"])
+    reports = client.get("/admin/profiling", headers=ADMIN).json()["reports"]
+    assert reports[0]["id"] == report_id
+    # Admin and metrics requests are never profiled
+    assert "x-profile-id" not in client.get("/metrics").headers
@@ -0,0 +1,102 @@
+import itertools
+import time
+
+from app.bitboard import decode, encode, get_geometry, is_win
+from app.game_logic import TicTacToeGame
+from app.search import (
+    SYMMETRIES,
+    WIN_SCORE,
+    AlphaBetaSearch,
+    HeuristicSearch,
+    canonical_key,
+)
+
+
+def minimax_score(board, ai_player, human_player):
+    game = TicTacToeGame(list(board), human_player, ai_player, ai_player, 'hard', True, None)
+    best_score = -float('inf')
+    for i in range(9):
+        if game.board[i] == '':
+            game.board[i] = ai_player
+            best_score = max(best_score, game._minimax(game.board, 0, False))
+            game.board[i] = ''
+    return best_score
+
+
+def test_symmetries_are_distinct_permutations():
+    assert len(set(SYMMETRIES)) == 8
+    for perm in SYMMETRIES:
+        assert sorted(perm) == list(range(9))
+
+
+def test_canonical_key_is_shared_by_symmetric_positions():
+    corner = canonical_key(encode(['X', '', '', '', 'O', '', '', '', ''], 'X'), 1 << 4)
+    for cell in (2, 6, 8):
+        assert canonical_key(1 << cell, 1 << 4) == corner
+    assert canonical_key(1 << 1, 1 << 4) != corner
+
+
+def test_scores_match_minimax_on_custom_positions():
+    # Boards that cannot occur in a real game (too many stones for one side,
+    # a line already on the board) are fine for the search.
+    engine = AlphaBetaSearch()
+    for cells in itertools.islice(itertools.product(['', 'X', 'O'], repeat=9), 0, 19683, 37):
+        board = list(cells)
+        if board.count('') < 2 or (is_win(encode(board, 'X')) and is_win(encode(board, 'O'))):
+            continue
+        result = engine.search(encode(board, 'O'), encode(board, 'X'))
+        assert result.score == minimax_score(board, 'O', 'X')
+
+
+def test_search_reports_nodes():
+    result = AlphaBetaSearch().search(0, 0)
+    assert result.move == 4
+    assert result.score == 0
+    assert 0 < result.nodes < 1000
+
+
+def test_search_takes_win():
+    board = ['O', 'O', '', 'X', 'X', '', '', '', '']
+    result = AlphaBetaSearch().search(encode(board, 'O'), encode(board, 'X'))
+    assert result.move == 2
+    assert result.score == 10
+    assert decode(encode(board, 'X'), encode(board, 'O')) == board
+
+
+def test_heuristic_search_wins_and_blocks_on_large_board():
+    geometry = get_geometry(15, 5)
+    cells = geometry.cells
+    board = [''] * cells
+    for cell in (112, 113, 114, 115):
+        board[cell] = 'O'
+    for cell in (0, 16, 32):
+        board[cell] = 'X'
+    result = HeuristicSearch(geometry, 2).search(encode(board, 'O'), encode(board, 'X'))
+    assert result.move in (111, 116)
+    assert result.score == WIN_SCORE
+
+    # X to move must block one end of O's open four, or lose next turn
+    result = HeuristicSearch(geometry, 2).search(encode(board, 'X'), encode(board, 'O'))
+    assert result.move in (111, 116)
+
+
+def test_heuristic_search_evaluation_matches_incremental_gain():
+    geometry = get_geometry(5, 4)
+    search = HeuristicSearch(geometry, 1)
+    mine, theirs = 1 << 12, (1 << 6) | (1 << 7)
+    for cell in geometry.legal_moves(mine | theirs):
+        after = search.evaluate(mine | (1 << cell), theirs)
+        assert after == search.evaluate(mine, theirs) + search._gain(mine, theirs, cell)
+
+
+def test_iterative_deepening_stops_at_deadline():
+    geometry = get_geometry(15, 5)
+    mine, theirs = 1 << 113, 1 << 112
+    # A deadline that has already passed still leaves the depth-1 move
+    result = HeuristicSearch(geometry, 4).search(mine, theirs, deadline=time.perf_counter())
+    assert result.depth == 1
+    assert result.move is not None
+
+    result = HeuristicSearch(geometry, 2).search(mine, theirs)
+    assert result.depth == 2
+    assert result.nodes > 0
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import main
+from app.sessions import parse_move
+
+
+def test_parse_move():
+    assert parse_move("4") == 4
+    assert parse_move('{"cell": 7}') == 7
+    assert parse_move("null") is None
+    for text in ("true", '"4"', "{", "1" * 100):
+        with pytest.raises(HTTPException):
+            parse_move(text)
+
+
+def new_game(client, current_player="X"):
+    return client.post("/games", json={
+        "board": [''] * 9,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": current_player,
+        "difficulty": "hard",
+        "game_active": True,
+    }).json()["id"]
+
+
+def test_play_a_game_over_a_socket(fake_database):
+    client = TestClient(main.app)
+    game_id = new_game(client)
+    with client.websocket_connect(f"/games/{game_id}/ws") as socket:
+        state = socket.receive_json()
+        assert state["type"] == "state"
+        board = state["game"]["board"]
+
+        socket.send_text("4")
+        reply = socket.receive_json()
+        assert reply["type"] == "move"
+        assert [move[:1] + move[2:] for move in reply["moves"]] == [[1, 'X'], [2, 'O']]
+        assert reply["current_player"] == "X"
+
+        socket.send_text("4")
+        assert socket.receive_json() == {"type": "error", "status": 409, "detail": "Cell is already taken"}
+
+        while reply["game_active"]:
+            for ply, cell, player in reply["moves"]:
+                board[cell] = player
+            socket.send_text(str(board.index('')))
+            reply = socket.receive_json()
+        # Hard mode never loses
+        assert reply["winner"] in ("O", "tie")
+
+    assert main.sessions == {}
+    stored = fake_database.games[game_id]
+    assert stored["game_active"] is False
+    assert [move["ply"] for move in fake_database.moves[game_id].values()] == list(range(1, len(fake_database.moves[game_id]) + 1))
+
+
+def test_ai_opens_when_asked(fake_database):
+    client = TestClient(main.app)
+    game_id = new_game(client, current_player="O")
+    with client.websocket_connect(f"/games/{game_id}/ws") as socket:
+        socket.receive_json()
+        socket.send_json({"cell": None})
+        reply = socket.receive_json()
+        assert [move[2] for move in reply["moves"]] == ['O']
+
+
+def test_unknown_game_is_refused(fake_database):
+    client = TestClient(main.app)
+    with pytest.raises(WebSocketDisconnect) as error, client.websocket_connect("/games/999/ws") as socket:
+        socket.receive_json()
+    assert error.value.code == 4404
+
+
+def test_refusal_is_sent_after_the_handshake(fake_database):
+    # A close before accept reaches a real client as an HTTP 403, so the
+    # close code must follow the accept
+    sent = []
+
+    async def receive():
+        return {"type": "websocket.connect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": "/games/999/ws",
+             "raw_path": b"/games/999/ws", "query_string": b"", "headers": [], "root_path": "",
+             "client": ("test", 1), "server": ("test", 80), "subprotocols": [], "app": main.app}
+    asyncio.run(main.app.router(scope, receive, send))
+    assert [message["type"] for message in sent] == ["websocket.accept", "websocket.close"]
+    assert sent[1]["code"] == 4404
+
+
+def test_failed_search_takes_back_the_move(fake_database, monkeypatch):
+    run_engine = main.run_engine
+    failures = [HTTPException(status_code=504, detail="AI move timed out")]
+
+    async def flaky(*args):
+        if failures:
+            raise failures.pop()
+        return await run_engine(*args)
+
+    client = TestClient(main.app)
+    game_id = new_game(client)
+    with client.websocket_connect(f"/games/{game_id}/ws") as socket:
+        socket.receive_json()
+        monkeypatch.setattr(main, "run_engine", flaky)
+        socket.send_text("4")
+        assert socket.receive_json()["status"] == 504
+        game = main.sessions[game_id].game
+        assert (game.board[4], game.current_player) == ('', 'X')
+
+        socket.send_text("4")
+        assert socket.receive_json()["moves"][0][:2] == [1, 4]
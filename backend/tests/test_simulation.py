@@ -0,0 +1,31 @@
+import random
+
+from app.game_logic import TicTacToeGame
+from app.simulation import play_chunk, run
+
+
+def test_game_uses_given_rng():
+    moves = []
+    for _ in range(2):
+        game = TicTacToeGame([''] * 9, 'X', 'O', 'O', 'easy', True, None, rng=random.Random(7))
+        moves.append([game.get_ai_move() for _ in range(5)])
+    assert moves[0] == moves[1]
+
+
+def test_play_chunk_is_reproducible():
+    task = (0, 'easy', 'random', 0, 50, 3, 3, 0.01, "1:0:0")
+    first = play_chunk(task)
+    assert first == play_chunk(task)
+    assert first["a_wins"] + first["b_wins"] + first["ties"] == 50
+
+
+def test_hard_never_loses():
+    result = play_chunk((0, 'hard', 'random', 0, 200, 3, 3, 0.01, "2:0:0"))
+    assert result["b_wins"] == 0
+
+
+def test_run_does_not_depend_on_workers():
+    one, _ = run(['easy', 'random'], 1200, seed=3, workers=1)
+    two, _ = run(['easy', 'random'], 1200, seed=3, workers=2)
+    assert one == two
+    assert [(total["a"], total["b"]) for total in one] == [('easy', 'easy'), ('easy', 'random'), ('random', 'random')]
@@ -0,0 +1,45 @@
+from app.bitboard import decode
+from app.game_logic import TicTacToeGame
+from app.solver import build_solved_table, lookup_best_move
+
+
+def make_game(board, ai_player):
+    return TicTacToeGame(
+        board=list(board),
+        human_player='O' if ai_player == 'X' else 'X',
+        ai_player=ai_player,
+        current_player=ai_player,
+        difficulty='hard',
+        game_active=True,
+        winner=None
+    )
+
+
+def test_table_covers_reachable_positions():
+    table = build_solved_table()
+    # 4,520 non-terminal positions, keyed relative to the side to move
+    assert len(table) == 4520
+    assert (0, 0) in table
+
+
+def test_table_matches_minimax():
+    for (mine, theirs), (move, score) in build_solved_table().items():
+        board = decode(mine, theirs)
+        if board.count('') > 4:
+            continue
+        assert make_game(board, 'X')._minimax_move() == move
+
+
+def test_lookup_takes_win_and_block():
+    assert lookup_best_move(['O', 'O', '', 'X', 'X', '', '', '', ''], 'O', 'X') == (2, 10)
+    assert lookup_best_move(['X', 'X', '', '', 'O', '', '', '', ''], 'O', 'X')[0] == 2
+
+
+def test_lookup_unknown_position():
+    # X has already won, so this board never reaches the AI in a real game
+    assert lookup_best_move(['X', 'X', 'X', 'O', 'O', '', '', '', ''], 'O', 'X') is None
+
+
+def test_hard_move_falls_back_to_search():
+    game = make_game(['X', 'X', 'X', 'O', 'O', '', '', '', ''], 'O')
+    assert game.get_ai_move() in [5, 6, 7, 8]
@@ -0,0 +1,67 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import main
+from app.engine_pool import EnginePool
+from app.startup import Startup
+
+
+def test_phases_are_timed():
+    startup = Startup()
+    with startup.phase("fast"):
+        pass
+    with pytest.raises(RuntimeError), startup.phase("broken"):
+        raise RuntimeError("no database")
+    assert startup.phases["fast"]["status"] == "done"
+    assert startup.phases["fast"]["seconds"] >= 0
+    assert startup.phases["broken"] == {"status": "failed", "seconds": startup.phases["broken"]["seconds"],
+                                        "error": "no database"}
+    assert startup.state()["ready"] is False
+
+
+@pytest.fixture
+def server(fake_database, monkeypatch):
+    # A process that has not started up yet
+    monkeypatch.setattr(main, "engine_pool", EnginePool(workers=0))
+    monkeypatch.setattr(main, "startup", Startup())
+    monkeypatch.setattr(main, "GAME_ARCHIVE_AFTER", 0)
+    return fake_database
+
+
+def test_ready_after_warm_up(server):
+    async def check():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/readyz")).status_code == 503
+            await main.startup_event()
+            try:
+                assert (await client.get("/healthz")).json() == {"status": "ok"}
+                await main.warm_up_task
+                response = await client.get("/readyz")
+                assert response.status_code == 200
+                body = response.json()
+                assert body["database"] == "ok"
+                for phase in ("import", "pool", "migrate", "solved_table", "engine_workers", "warm_up"):
+                    assert body["phases"][phase]["status"] == "done"
+
+                # Not ready while the database does not answer
+                fake_ping = main.ping_database
+                async def down():
+                    raise OSError("connection refused")
+                main.ping_database = down
+                response = await client.get("/readyz")
+                assert response.status_code == 503
+                assert response.json()["database"] == "unavailable: connection refused"
+
+                # Nor for the probe that replaces a broken engine pool
+                main.ping_database = fake_ping
+                main.engine_pool.restart_if_broken = lambda: True
+                response = await client.get("/readyz")
+                assert response.status_code == 503
+                assert response.json()["engine_pool"] == "restarted after a worker died"
+            finally:
+                await main.shutdown_event()
+
+    asyncio.run(check())
@@ -0,0 +1,94 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.stats import StatsCache, leaderboard, summarize
+
+ROWS = [
+    {"difficulty": "easy", "board_size": 3, "win_length": 3, "human_player": "X", "ai_player": "O", "outcome": "human", "games": 6},
+    {"difficulty": "easy", "board_size": 3, "win_length": 3, "human_player": "X", "ai_player": "O", "outcome": "ai", "games": 2},
+    {"difficulty": "hard", "board_size": 3, "win_length": 3, "human_player": "O", "ai_player": "X", "outcome": "tie", "games": 4},
+    {"difficulty": "hard", "board_size": 7, "win_length": 5, "human_player": "X", "ai_player": "O", "outcome": "ai", "games": 8},
+]
+
+
+def test_summarize():
+    stats = summarize(ROWS)
+    assert stats["total"]["games"] == 20
+    assert stats["by_difficulty"]["easy"] == {"games": 8, "human_wins": 6, "ai_wins": 2, "ties": 0, "human_win_rate": 0.75}
+    assert stats["by_difficulty"]["hard"]["ties"] == 4
+    assert stats["by_board"]["7x7/5"]["ai_wins"] == 8
+
+
+def test_leaderboard_counts_both_roles():
+    board = leaderboard(ROWS)
+    assert [entry["player"] for entry in board] == ["O", "X"]
+    o = board[0]
+    assert (o["games"], o["wins"], o["losses"], o["ties"]) == (20, 10, 6, 4)
+
+
+def test_stats_cache_serves_rows_until_expiry():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return ROWS
+
+    async def run():
+        cache = StatsCache(fetch, ttl=60)
+        await asyncio.gather(cache.rows(), cache.rows(), cache.rows())
+        cache.clear()
+        await cache.rows()
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_stats_endpoints(fake_database):
+    main.stats_cache.clear()
+
+    client = TestClient(main.app)
+    client.post("/games", json={
+        "board": ['X', 'X', 'X', 'O', 'O', '', '', '', ''],
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "O",
+        "difficulty": "normal",
+        "game_active": False,
+        "winner": "X",
+    })
+    stats = client.get("/stats").json()
+    assert stats["by_difficulty"]["normal"]["human_wins"] == 1
+    assert client.get("/leaderboard").json()[0]["player"] == "X"
+    main.stats_cache.clear()
+
+
+def test_games_played_like_the_frontend_are_counted(fake_database):
+    # The frontend sends the human's move with PUT, always as an active
+    # game, and lets /ai-move find the winner
+    main.stats_cache.clear()
+    client = TestClient(main.app)
+    game = client.post("/games", json={
+        "board": [''] * 9,
+        "human_player": "X",
+        "ai_player": "O",
+        "current_player": "X",
+        "difficulty": "hard",
+        "game_active": True,
+        "winner": None,
+    }).json()
+    while game["game_active"]:
+        board = list(game["board"])
+        board[board.index('')] = game["human_player"]
+        game = client.put(f"/games/{game['id']}", json={**game, "board": board,
+                                                        "current_player": game["ai_player"]}).json()
+        game = client.post("/ai-move", json=game).json()
+
+    stored = fake_database.games[game["id"]]
+    assert (stored["game_active"], stored["winner"], stored["board"]) == (False, game["winner"], game["board"])
+    assert len(fake_database.moves[game["id"]]) == 9 - game["board"].count('')
+    stats = client.get("/stats").json()
+    assert stats["by_difficulty"]["hard"]["games"] == 1
+    assert stats["total"]["ai_wins"] + stats["total"]["ties"] == 1
+    main.stats_cache.clear()
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, wire
+from app.wire import COMPACT_MEDIA_TYPE
+
+COMPACT = {"Content-Type": COMPACT_MEDIA_TYPE, "Accept": COMPACT_MEDIA_TYPE}
+
+
+@pytest.fixture
+def client(fake_database):
+    return TestClient(main.app)
+
+
+def new_game(board):
+    return {"board": board, "human_player": "X", "ai_player": "O", "current_player": "O",
+            "difficulty": "hard", "game_active": True}
+
+
+def test_board_accepts_text():
+    game = main.Game(**new_game("X...O...."))
+    assert game.board == ['X', '', '', '', 'O', '', '', '', '']
+
+
+def test_compact_round_trip(client):
+    response = client.post("/games", content=json.dumps(new_game("XX..O....")), headers=COMPACT)
+    assert response.headers["content-type"] == COMPACT_MEDIA_TYPE
+    game = response.json()
+    assert game["board"] == "XX..O...."
+
+    # The AI blocks at 2; the reply is compact too
+    reply = client.post("/ai-move", content=json.dumps(game), headers=COMPACT).json()
+    assert reply["board"] == "XXO.O...."
+
+    # Plain JSON clients still get lists
+    assert client.get(f"/games/{game['id']}").json()["board"] == ['X', 'X', 'O', '', 'O', '', '', '', '']
+    assert client.get(f"/games/{game['id']}", headers=COMPACT).json()["board"] == "XXO.O...."
+
+
+def test_dumps_without_orjson(monkeypatch):
+    value = {"board": "X........", "moves": [[1, 0, "X"]]}
+    expected = wire.dumps(value)
+    monkeypatch.setattr(wire, "orjson", None)
+    assert wire.dumps(value) == expected
+    assert wire.loads(expected) == value